@@ -1,102 +1,1730 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+import aiohttp
+import argparse
 import asyncio
+import os
 import re
-import sqlitecloud
-import requests
+import secrets
+import socket
 import datetime
+import functools
+import gzip
+import hashlib
+import ipaddress
+import json
+import math
+import random
+import tempfile
+import time
 from typing import Optional, List
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from storage import StorageDriver, create_driver
+from metrics import MetricsRegistry, MetricsServer
+from cloudflare import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, CircuitBreaker, CloudflareBatcher,
+                        CloudflareClient, CloudflareError)
+from records_io import (EXPORT_EXTENSIONS, RECORD_FORMATS, RECORD_TYPES, ImportFormatError, detect_format,
+                        encode_records, export_header, parse_records, prepare_import_row, validate_record)
 
 TOKEN = 'YOUR_DISCORD_TOKEN'
 CF_API_URL = 'https://api.cloudflare.com/client/v4/zones' # Do not edit under any circumstances, to avoid inactivity
 CF_API_KEY = 'YOUR_CLOUDFLARE_API_KEY'
 CF_EMAIL = 'YOUR-CLOUDFLARE_EMAIL'
 ZONE_ID = 'YOUR_CLOUDFLARE_ZONE_ID'
+RECORD_DOMAIN = 'is-app.top'
+CF_RATE_LIMIT = 4.0 # Requests per second; Cloudflare allows 1200 per 5 minutes per token
+CF_BURST = 10
+CF_MAX_RETRIES = 4
+
+DB_BACKEND = 'sqlitecloud' # 'sqlitecloud' or 'sqlite' (local file, WAL mode)
+DB_URL = "SQLITECLOUD_CONNECTION_STRING"
+SQLITE_PATH = 'records.db'
+COMMAND_HASH_PATH = '.command_tree_hash' # Delete this file to force a slash command sync
+SHARD_COUNT = None # Total shards across every process; None lets Discord pick and runs them all in one process
+SHARD_IDS = None # Shards run by this process, e.g. [0, 1]; requires SHARD_COUNT (or pass --shard-count/--shards)
 
 LOG_CHANNEL_ID = YOUR LOG_CHANNEL_ID
 ADMIN_ROLE_ID = YOUR_ADMIN_ROLE_ID
 
+BULK_APPROVE_LIMIT = 500
+GC_INTERVAL_HOURS = 6
+GC_RETENTION_DAYS = 7
+GC_CHUNK_SIZE = 200
+RECONCILE_INTERVAL_HOURS = 12
+RECONCILE_AUTO_REPAIR = False
+RECONCILE_FULL_EVERY = 4 # Every Nth scheduled run pages the whole zone to catch edits made outside the bot
+RECONCILE_INCREMENTAL_LIMIT = 100 # Past this many changed names a run pages the whole zone instead
+USER_CACHE_SIZE = 1000
+USER_CACHE_TTL = 300
+USER_CACHE_CHECK_INTERVAL = 5.0 # With several shard processes, how stale a cached entry may get before it is re-checked
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108 # Set to None to disable the Prometheus endpoint
+DM_CONCURRENCY = 5
+DM_PROGRESS_INTERVAL = 3.0
+IMPORT_MAX_BYTES = 5 * 1024 * 1024
+IMPORT_MAX_ROWS = 10000
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_PENDING = 50 # Pending records a non-admin may hold after an import; admins are not limited
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_MAX_BYTES = 10 * 1024 * 1024
+LOG_FLUSH_INTERVAL = 10.0
+LOG_DIGEST_SIZE = 25
+LOG_QUEUE_SIZE = 1000
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_POLL_INTERVAL = 5.0
+OUTBOX_RETRY_BASE = 2.0
+OUTBOX_RETRY_MAX = 300.0
+OUTBOX_BREAKER_THRESHOLD = 5
+OUTBOX_BREAKER_RESET = 60.0
+# command -> (burst, seconds to refill one use); admins are never throttled
+THROTTLE_LIMITS = {
+    "create_record": (5, 12.0),
+    "delete_record": (5, 12.0),
+    "import_records": (2, 300.0),
+    "view_records": (10, 3.0)
+}
+THROTTLE_SWEEP_INTERVAL = 300.0
+LEASE_TTL = 30.0 # Seconds before another process may take over the scheduled jobs
+LEASE_RENEW_INTERVAL = 10.0
+
+METRICS = MetricsRegistry()
+METRICS.describe("command_latency_seconds", "Latency of app commands")
+METRICS.describe("commands_in_flight", "App commands currently running")
+METRICS.describe("db_query_seconds", "Latency of database queries")
+METRICS.describe("db_queries_in_flight", "Database queries currently running")
+METRICS.describe("cloudflare_request_seconds", "Latency of Cloudflare API calls")
+METRICS.describe("cloudflare_requests_in_flight", "Cloudflare API calls currently running")
+METRICS.describe("cloudflare_responses_total", "Cloudflare API responses by status code")
+METRICS.describe("cloudflare_retries_total", "Cloudflare API calls retried after a 429, 5xx or connection error")
+METRICS.describe("commands_throttled_total", "App commands rejected by the per-user throttle")
+METRICS.describe("log_events_dropped_total", "Log channel events dropped because the queue was full")
+METRICS.describe("lease_held", "Whether this process holds the named lease")
+
+def instrumented(command: str):
+    return METRICS.timed("command_latency_seconds", in_flight="commands_in_flight", command=command)
+
+class CommandThrottle:
+    def __init__(self, limits: dict, sweep_interval: float = THROTTLE_SWEEP_INTERVAL):
+        self.limits = limits
+        self.sweep_interval = sweep_interval
+        # (user id, command) -> [tokens, last update]
+        self.buckets = {}
+        self.last_sweep = time.monotonic()
+
+    def hit(self, user_id: int, command: str) -> float:
+        # Takes one use from the caller's bucket; returns 0 if allowed, else seconds until the next use.
+        limit = self.limits.get(command)
+        if limit is None:
+            return 0.0
+        burst, refill = limit
+        now = time.monotonic()
+        if now - self.last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        bucket = self.buckets.get((user_id, command))
+        if bucket is None:
+            bucket = self.buckets[(user_id, command)] = [float(burst), now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) / refill)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) * refill
+
+    def sweep(self, now: float = None):
+        # A bucket that has refilled completely is the same as no bucket at all.
+        now = now if now is not None else time.monotonic()
+        self.last_sweep = now
+        idle = [
+            key for key, (tokens, updated) in self.buckets.items()
+            if key[1] not in self.limits
+            or tokens + (now - updated) / self.limits[key[1]][1] >= self.limits[key[1]][0]
+        ]
+        for key in idle:
+            del self.buckets[key]
+
+THROTTLE = CommandThrottle(THROTTLE_LIMITS)
+
+def throttled(command: str):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            if not any(role.id == ADMIN_ROLE_ID for role in getattr(interaction.user, "roles", [])):
+                retry_after = THROTTLE.hit(interaction.user.id, command)
+                if retry_after:
+                    METRICS.inc("commands_throttled_total", command=command)
+                    await interaction.response.send_message(
+                        f"You're using this command too often. Please retry in {math.ceil(retry_after)}s.",
+                        ephemeral=True
+                    )
+                    return
+            return await func(self, interaction, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+def _migrate_base_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS records (
+        userid TEXT NOT NULL,
+        record_name TEXT NOT NULL,
+        record_type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        approved INTEGER DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    if not _column_exists(cursor, "records", "created_at"):
+        # SQLite rejects ADD COLUMN with a non-constant default, so backfill instead.
+        cursor.execute("ALTER TABLE records ADD COLUMN created_at DATETIME")
+        cursor.execute("UPDATE records SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+def _migrate_cf_record_id(cursor):
+    if not _column_exists(cursor, "records", "cf_record_id"):
+        cursor.execute("ALTER TABLE records ADD COLUMN cf_record_id TEXT")
+
+def _migrate_name_key(cursor):
+    if not _column_exists(cursor, "records", "name_key"):
+        cursor.execute("ALTER TABLE records ADD COLUMN name_key TEXT")
+    cursor.execute("UPDATE records SET name_key = LOWER(TRIM(record_name))")
+    # Older versions only checked duplicates per user, so the same name may belong to several users.
+    # The approved (or oldest) row per name stays; the others are moved, not deleted, to
+    # records_conflicts so an admin can sort them out (approved ones still exist in Cloudflare).
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS records_conflicts (
+        original_rowid INTEGER,
+        userid TEXT NOT NULL,
+        record_name TEXT NOT NULL,
+        record_type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        approved INTEGER,
+        created_at DATETIME,
+        cf_record_id TEXT,
+        name_key TEXT,
+        quarantined_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    SELECT rowid, userid, record_name, record_type, content, approved, created_at, cf_record_id, name_key
+    FROM records
+    WHERE EXISTS (
+        SELECT 1 FROM records AS other
+        WHERE other.name_key = records.name_key
+        AND (other.approved > records.approved
+             OR (other.approved = records.approved AND other.rowid < records.rowid))
+    )
+    """)
+    conflicts = cursor.fetchall()
+    if conflicts:
+        cursor.executemany("""
+        INSERT INTO records_conflicts
+            (original_rowid, userid, record_name, record_type, content, approved, created_at, cf_record_id, name_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, conflicts)
+        cursor.executemany("DELETE FROM records WHERE rowid = ?", [(row[0],) for row in conflicts])
+        print(f"Migration 3: moved {len(conflicts)} records with duplicate names to records_conflicts:")
+        for _, userid, record_name, record_type, _, approved, _, _, _ in conflicts:
+            print(f"  {record_name} ({record_type}) of user {userid}, {'approved' if approved else 'pending'}")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_records_name_key ON records (name_key)")
+
+MIGRATIONS = [
+    (1, _migrate_base_table),
+    (2, _migrate_cf_record_id),
+    (3, _migrate_name_key),
+    (4, [
+        "CREATE INDEX IF NOT EXISTS idx_records_user_approved_created ON records (userid, approved, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_records_pending_created ON records (created_at) WHERE approved = 0",
+        "CREATE INDEX IF NOT EXISTS idx_records_created ON records (created_at)"
+    ]),
+    (5, [
+        """CREATE TABLE IF NOT EXISTS cf_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            record_type TEXT NOT NULL,
+            content TEXT,
+            cf_record_id TEXT,
+            userid TEXT NOT NULL,
+            requested_by TEXT,
+            priority INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_cf_outbox_name ON cf_outbox (name_key, id)",
+        "CREATE INDEX IF NOT EXISTS idx_cf_outbox_due ON cf_outbox (next_attempt_at)"
+    ]),
+    (6, [
+        """CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )"""
+    ]),
+    (7, [
+        # Bumped on every change to a user's records, so processes can tell whether a cached copy is stale.
+        """CREATE TABLE IF NOT EXISTS record_versions (
+            userid TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS records_version_insert AFTER INSERT ON records BEGIN
+            INSERT OR IGNORE INTO record_versions (userid) VALUES (NEW.userid);
+            UPDATE record_versions SET version = version + 1 WHERE userid = NEW.userid;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS records_version_update AFTER UPDATE ON records BEGIN
+            INSERT OR IGNORE INTO record_versions (userid) VALUES (NEW.userid);
+            UPDATE record_versions SET version = version + 1 WHERE userid IN (OLD.userid, NEW.userid);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS records_version_delete AFTER DELETE ON records BEGIN
+            UPDATE record_versions SET version = version + 1 WHERE userid = OLD.userid;
+        END"""
+    ]),
+    (8, [
+        # Names whose rows changed, so reconciliation can limit itself to them between full runs.
+        """CREATE TABLE IF NOT EXISTS record_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name_key TEXT
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS records_change_insert AFTER INSERT ON records BEGIN
+            INSERT INTO record_changes (name_key) VALUES (NEW.name_key);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS records_change_update AFTER UPDATE ON records BEGIN
+            INSERT INTO record_changes (name_key) SELECT NEW.name_key UNION SELECT OLD.name_key;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS records_change_delete AFTER DELETE ON records BEGIN
+            INSERT INTO record_changes (name_key) VALUES (OLD.name_key);
+        END"""
+    ]),
+    (9, [
+        """CREATE TABLE IF NOT EXISTS reconcile_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )"""
+    ])
+]
+
+def run_migrations(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    row = cursor.fetchone()
+    current = row[0] if row and row[0] is not None else 0
+    conn.commit()
+
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            if callable(migration):
+                migration(cursor)
+            else:
+                for statement in migration:
+                    cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Migration {version} failed: {e}")
+            raise
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, driver: Optional[StorageDriver] = None):
+        self.driver = driver or create_driver(DB_BACKEND, url=DB_URL, path=SQLITE_PATH)
         self.connection_pool = []
         self.pool_lock = asyncio.Lock()
+        self.min_connections = 1
         self.max_connections = 5
-        self.db_url = "SQLITECLOUD_CONNECTION_STRING"
-        self.ensure_table_schema()
+        self.acquire_timeout = 10.0
+        self.health_check_interval = 30.0
+        self.pool_semaphore = asyncio.Semaphore(self.max_connections)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="db")
+        self.writer_lock = asyncio.Lock()
+        self.writer_conn = None
+        self.closed = False
+        self._schema_ready: Optional[asyncio.Future] = None
 
     def ensure_table_schema(self):
-        with sqlitecloud.connect(self.db_url) as conn:
-            cursor = conn.cursor()
-            schema = """
-            CREATE TABLE IF NOT EXISTS records (
-                userid TEXT NOT NULL,
-                record_name TEXT NOT NULL,
-                record_type TEXT NOT NULL,
-                content TEXT NOT NULL,
-                approved INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        conn = self.driver.connect()
+        try:
+            run_migrations(conn)
+        finally:
+            conn.close()
+
+    async def ensure_schema(self):
+        # Runs the schema check once, off the event loop; every connection waits on it.
+        failed = self._schema_ready is not None and self._schema_ready.done() and (
+            self._schema_ready.cancelled() or self._schema_ready.exception() is not None
+        )
+        if self._schema_ready is None or failed:
+            self._schema_ready = asyncio.ensure_future(
+                self._run(self.ensure_table_schema, executor=self.driver.writer_executor)
             )
-            """
-            cursor.execute(schema)
-            try:
-                cursor.execute("SELECT created_at FROM records LIMIT 1")
-            except sqlitecloud.exceptions.SQLiteCloudOperationalError:
-                cursor.execute("ALTER TABLE records ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
-            conn.commit()
+        await asyncio.shield(self._schema_ready)
 
-    async def get_connection(self):
+    def _connect(self):
+        # With a dedicated writer, pooled connections only ever serve reads.
+        return self.driver.connect(read_only=self.driver.dedicated_writer)
+
+    def _is_alive(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    async def _run(self, func, *args, executor: ThreadPoolExecutor = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor or self.executor, func, *args)
+
+    def _executor_for(self, conn) -> ThreadPoolExecutor:
+        if conn is not None and conn is self.writer_conn:
+            return self.driver.writer_executor
+        return self.executor
+
+    async def warm_up(self):
+        await self.ensure_schema()
         async with self.pool_lock:
-            if not self.connection_pool:
+            missing = self.min_connections - len(self.connection_pool)
+        for _ in range(max(missing, 0)):
+            try:
+                conn = await self._run(self._connect)
+            except Exception as e:
+                print(f"Failed to create new connection: {e}")
+                break
+            async with self.pool_lock:
+                self.connection_pool.append((conn, time.monotonic()))
+
+    async def acquire(self, timeout: float = None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self.pool_semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise Exception("Timed out waiting for a database connection")
+
+        try:
+            while True:
+                async with self.pool_lock:
+                    entry = self.connection_pool.pop() if self.connection_pool else None
+                if entry is None:
+                    return await self._run(self._connect)
+                conn, last_used = entry
+                if time.monotonic() - last_used < self.health_check_interval:
+                    return conn
+                if await self._run(self._is_alive, conn):
+                    return conn
+                self._close_quietly(conn)
+        except Exception as e:
+            self.pool_semaphore.release()
+            print(f"Failed to create new connection: {e}")
+            raise Exception("Could not establish database connection") from e
+
+    async def release(self, conn, discard: bool = False):
+        try:
+            async with self.pool_lock:
+                if not discard and not self.closed and len(self.connection_pool) < self.max_connections:
+                    self.connection_pool.append((conn, time.monotonic()))
+                    conn = None
+            if conn is not None:
+                self._close_quietly(conn)
+        finally:
+            self.pool_semaphore.release()
+
+    @asynccontextmanager
+    async def writer(self):
+        executor = self.driver.writer_executor
+        async with self.writer_lock:
+            if self.writer_conn is None:
                 try:
-                    conn = sqlitecloud.connect(self.db_url)
-                    self.connection_pool.append(conn)
+                    self.writer_conn = await self._run(self.driver.connect, executor=executor)
                 except Exception as e:
                     print(f"Failed to create new connection: {e}")
-                    return None
-            return self.connection_pool.pop() if self.connection_pool else None
+                    raise Exception("Could not establish database connection") from e
+            conn = self.writer_conn
+            try:
+                yield conn
+            except Exception:
+                if not await self._run(self._is_alive, conn, executor=executor):
+                    self._close_quietly(conn)
+                    self.writer_conn = None
+                raise
+
+    @asynccontextmanager
+    async def connection(self, timeout: float = None, write: bool = False):
+        await self.ensure_schema()
+        if write and self.driver.dedicated_writer:
+            async with self.writer() as conn:
+                yield conn
+            return
 
-    async def release_connection(self, conn):
+        conn = await self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            discard = not await self._run(self._is_alive, conn)
+            raise
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            await self.release(conn, discard)
+
+    async def close(self):
         async with self.pool_lock:
-            if len(self.connection_pool) < self.max_connections:
-                self.connection_pool.append(conn)
+            self.closed = True
+            pool, self.connection_pool = self.connection_pool, []
+        for conn, _ in pool:
+            self._close_quietly(conn)
+        if self.writer_conn is not None:
+            await self._run(self._close_quietly, self.writer_conn, executor=self.driver.writer_executor)
+            self.writer_conn = None
+        self.executor.shutdown(wait=False)
+        self.driver.close()
+
+    QUERY_NAME_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+    @staticmethod
+    def query_name(query: str) -> str:
+        words = query.lstrip().split(None, 1)
+        verb = words[0].lower() if words else "unknown"
+        match = DatabaseManager.QUERY_NAME_PATTERN.search(query)
+        return f"{verb}_{match.group(1).lower()}" if match else verb
+
+    def track(self, query: str, name: Optional[str] = None):
+        return METRICS.track("db_query_seconds", in_flight="db_queries_in_flight",
+                             query=name or self.query_name(query))
+
+    @staticmethod
+    def is_read_only(query: str) -> bool:
+        words = query.lstrip().split(None, 1)
+        return bool(words) and words[0].upper() in ("SELECT", "PRAGMA", "EXPLAIN")
+
+    def _execute(self, conn, query: str, params: tuple, fetch: bool, commit: bool = True):
+        cursor = conn.cursor()
+        try:
+            if params:
+                cursor.execute(query, params)
             else:
-                conn.close()
+                cursor.execute(query)
+            # Fetch before committing: SQLite can't commit while a RETURNING statement is still open.
+            rows = cursor.fetchall() if fetch else None
+            if commit:
+                conn.commit()
+        except Exception:
+            if commit:
+                conn.rollback()
+            raise
+        if fetch:
+            return rows
+        return cursor
+
+    def _execute_many(self, conn, query: str, params_seq: List[tuple], commit: bool = True):
+        cursor = conn.cursor()
+        try:
+            if commit:
+                cursor.execute("BEGIN")
+            cursor.executemany(query, params_seq)
+            if commit:
+                conn.commit()
+        except Exception:
+            if commit:
+                conn.rollback()
+            raise
+        return cursor
+
+    def _begin(self, conn):
+        conn.cursor().execute("BEGIN")
 
     @asynccontextmanager
-    async def connection(self):
-        conn = await self.get_connection()
+    async def transaction(self, timeout: float = None):
+        async with self.connection(timeout, write=True) as conn:
+            executor = self._executor_for(conn)
+            await self._run(self._begin, conn, executor=executor)
+            try:
+                yield Transaction(self, conn)
+            except BaseException:
+                await self._run(conn.rollback, executor=executor)
+                raise
+            await self._run(conn.commit, executor=executor)
+
+    async def execute_many(self, query: str, params_seq: List[tuple], name: Optional[str] = None):
+        with self.track(query, name):
+            async with self.connection(write=True) as conn:
+                try:
+                    return await self._run(self._execute_many, conn, query, list(params_seq),
+                                           executor=self._executor_for(conn))
+                except Exception as e:
+                    print(f"Query execution error: {e}")
+                    raise
+
+    async def execute_query(self, query: str, params: tuple = None, fetch: bool = True,
+                            commit: Optional[bool] = None, name: Optional[str] = None) -> Optional[List]:
+        read_only = self.is_read_only(query)
+        if commit is None:
+            commit = not read_only
+        with self.track(query, name):
+            async with self.connection(write=not read_only) as conn:
+                try:
+                    return await self._run(self._execute, conn, query, params, fetch, commit,
+                                           executor=self._executor_for(conn))
+                except Exception as e:
+                    print(f"Query execution error: {e}")
+                    raise
+
+class Transaction:
+    def __init__(self, db: DatabaseManager, conn):
+        self.db = db
+        self.conn = conn
+
+    async def execute_query(self, query: str, params: tuple = None, fetch: bool = True,
+                            name: Optional[str] = None) -> Optional[List]:
+        with self.db.track(query, name):
+            try:
+                return await self.db._run(self.db._execute, self.conn, query, params, fetch, False,
+                                          executor=self.db._executor_for(self.conn))
+            except Exception as e:
+                print(f"Query execution error: {e}")
+                raise
+
+    async def execute_many(self, query: str, params_seq: List[tuple], name: Optional[str] = None):
+        with self.db.track(query, name):
+            try:
+                return await self.db._run(self.db._execute_many, self.conn, query, list(params_seq), False,
+                                          executor=self.db._executor_for(self.conn))
+            except Exception as e:
+                print(f"Query execution error: {e}")
+                raise
+
+class UserRecordCache:
+    # With several shard processes, changes made by another process can't invalidate this copy,
+    # so `shared` caches re-check the user's record_versions row, at most every check_interval
+    # seconds per entry. That bounds how stale a hit can be without a round-trip on every hit.
+    def __init__(self, db: DatabaseManager, max_entries: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL,
+                 shared: bool = False, check_interval: float = USER_CACHE_CHECK_INTERVAL):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.check_interval = check_interval
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._in_flight = 0
+        self._invalidated = {}
+        self._cleared_at = -1
+
+    async def _load(self, userid: str) -> dict:
+        rows = await self.db.execute_query(
+            """SELECT name_key, record_name, record_type, content, approved, created_at
+               FROM records
+               WHERE userid = ?
+               ORDER BY created_at DESC, rowid DESC""",
+            (userid,)
+        )
+        return {
+            "records": [(record_name, record_type, content, created_at)
+                        for _, record_name, record_type, content, approved, created_at in rows if approved],
+            "names": {row[0] for row in rows}
+        }
+
+    async def _version(self, userid: str) -> Optional[int]:
+        rows = await self.db.execute_query("SELECT version FROM record_versions WHERE userid = ?", (userid,))
+        return rows[0][0] if rows else None
+
+    async def get(self, userid: str) -> dict:
+        entry = self.entries.get(userid)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.ttl:
+            fresh = True
+            if self.shared and now - entry[3] >= self.check_interval:
+                fresh = entry[2] == await self._version(userid)
+                if fresh and self.entries.get(userid) is entry:
+                    entry = self.entries[userid] = (entry[0], entry[1], entry[2], time.monotonic())
+            if fresh:
+                if userid in self.entries:
+                    self.entries.move_to_end(userid)
+                self.hits += 1
+                return entry[1]
+
+        self.misses += 1
+        generation = self._generation
+        self._in_flight += 1
         try:
-            yield conn
+            # Read the version first: a write that lands during the load then makes the entry stale.
+            version = await self._version(userid) if self.shared else None
+            value = await self._load(userid)
         finally:
-            if conn:
-                await self.release_connection(conn)
+            self._in_flight -= 1
+        # Don't cache a result that an invalidation raced with while it was loading.
+        if max(self._invalidated.get(userid, -1), self._cleared_at) <= generation:
+            self.entries[userid] = (time.monotonic(), value, version, time.monotonic())
+            self.entries.move_to_end(userid)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if not self._in_flight:
+            self._invalidated.clear()
+        return value
+
+    def invalidate(self, *userids):
+        self._generation += 1
+        for userid in userids:
+            userid = str(userid)
+            self.entries.pop(userid, None)
+            if self._in_flight:
+                self._invalidated[userid] = self._generation
+            self.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        self._cleared_at = self._generation
+        self.entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+class RecordPages:
+    def __init__(self, db: DatabaseManager, userid: Optional[str] = None, per_page: int = 10, cache_size: int = 5,
+                 record_cache: Optional[UserRecordCache] = None):
+        self.db = db
+        self.userid = userid
+        self.record_cache = record_cache
+        self.user_records = None
+        self.per_page = per_page
+        self.cache_size = cache_size
+        self.total = 0
+        self.pages = OrderedDict()
+        self.cursors = {0: None}
+
+    @property
+    def total_pages(self) -> int:
+        return max(1, -(-self.total // self.per_page))
+
+    async def count(self) -> int:
+        if self.userid is not None and self.record_cache is not None:
+            self.user_records = (await self.record_cache.get(self.userid))["records"]
+            self.total = len(self.user_records)
+            return self.total
+        if self.userid is None:
+            result = await self.db.execute_query("SELECT COUNT(*) FROM records")
+        else:
+            result = await self.db.execute_query(
+                "SELECT COUNT(*) FROM records WHERE userid = ? AND approved = 1",
+                (self.userid,)
+            )
+        self.total = result[0][0] if result else 0
+        return self.total
+
+    async def _fetch(self, cursor: Optional[tuple]) -> List:
+        if self.userid is None:
+            columns = "record_name, record_type, content, approved, userid, created_at, rowid"
+            conditions, params = [], []
+        else:
+            columns = "record_name, record_type, content, created_at, rowid"
+            conditions, params = ["userid = ?", "approved = 1"], [self.userid]
+        if cursor is not None:
+            conditions.append("(created_at, rowid) < (?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(self.per_page)
+        return await self.db.execute_query(
+            f"SELECT {columns} FROM records {where} ORDER BY created_at DESC, rowid DESC LIMIT ?",
+            tuple(params)
+        )
 
-    async def execute_query(self, query: str, params: tuple = None, fetch: bool = True) -> Optional[List]:
-        async with self.connection() as conn:
-            if not conn:
-                raise Exception("Could not establish database connection")
-            cursor = conn.cursor()
+    async def get(self, page: int) -> List:
+        if self.user_records is not None:
+            return self.user_records[page * self.per_page:(page + 1) * self.per_page]
+        if page in self.pages:
+            self.pages.move_to_end(page)
+            return self.pages[page]
+        while page not in self.cursors:
+            if not await self.get(max(self.cursors)):
+                return []
+        rows = await self._fetch(self.cursors[page])
+        if rows:
+            last = rows[-1]
+            self.cursors[page + 1] = (last[-2], last[-1])
+        records = [row[:-1] for row in rows]
+        self.pages[page] = records
+        if len(self.pages) > self.cache_size:
+            self.pages.popitem(last=False)
+        return records
+
+class RecordPaginator(discord.ui.View):
+    PAGE_PATTERN = re.compile(r"Page (\d+) of \d+")
+
+    def __init__(self, db: DatabaseManager, record_cache: Optional[UserRecordCache] = None, max_sessions: int = 5000):
+        super().__init__(timeout=None)
+        self.db = db
+        self.record_cache = record_cache
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def build_embed(self, records: List, page_num: int, total_pages: int, is_admin: bool, requester: str) -> discord.Embed:
+        embed = discord.Embed(
+            title="DNS Records" if not is_admin else "All DNS Records (Admin View)",
+            description=f"Page {page_num + 1} of {total_pages}",
+            color=discord.Color.blue(),
+            timestamp=datetime.datetime.utcnow()
+        )
+
+        for record in records:
+            if is_admin:
+                record_name, record_type, content, approved, userid, created_at = record
+                status = "✅ Approved" if approved else "⏳ Pending"
+                embed.add_field(
+                    name=f"📝 {record_name}",
+                    value=f"""
+                    **Type:** `{record_type}`
+                    **Content:** `{content}`
+                    **Status:** {status}
+                    **User:** <@{userid}>
+                    **Created:** {created_at}
+                    """,
+                    inline=False
+                )
+            else:
+                record_name, record_type, content, created_at = record
+                embed.add_field(
+                    name=f"📝 {record_name}",
+                    value=f"""
+                    **Type:** `{record_type}`
+                    **Content:** `{content}`
+                    **Created:** {created_at}
+                    """,
+                    inline=False
+                )
+
+        embed.set_footer(text=f"Requested by {requester}")
+        return embed
+
+    def _remember(self, message_id: int, pager: RecordPages, page: int, is_admin: bool):
+        self.sessions[message_id] = (pager, page, is_admin)
+        self.sessions.move_to_end(message_id)
+        if len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+    async def start(self, interaction: discord.Interaction, pager: RecordPages, is_admin: bool):
+        embed = self.build_embed(await pager.get(0), 0, pager.total_pages, is_admin, interaction.user.name)
+        message = await interaction.edit_original_response(
+            content=None,
+            embed=embed,
+            view=self if pager.total_pages > 1 else None
+        )
+        if pager.total_pages > 1:
+            self._remember(message.id, pager, 0, is_admin)
+
+    async def _restore(self, interaction: discord.Interaction):
+        # Sessions are lost on restart or eviction; rebuild from the message and the clicking user.
+        is_admin = any(role.id == ADMIN_ROLE_ID for role in getattr(interaction.user, "roles", []))
+        pager = RecordPages(self.db, None if is_admin else str(interaction.user.id), record_cache=self.record_cache)
+        await pager.count()
+        page = 0
+        embeds = interaction.message.embeds if interaction.message else []
+        match = self.PAGE_PATTERN.search(embeds[0].description or "") if embeds else None
+        if match:
+            page = min(int(match.group(1)) - 1, pager.total_pages - 1)
+        return pager, page, is_admin
+
+    async def turn(self, interaction: discord.Interaction, step: int):
+        try:
+            session = self.sessions.get(interaction.message.id)
+            if session is None:
+                session = await self._restore(interaction)
+            pager, page, is_admin = session
+
+            page = max(0, min(page + step, pager.total_pages - 1))
+            records = await pager.get(page)
+            self._remember(interaction.message.id, pager, page, is_admin)
+            await interaction.response.edit_message(
+                embed=self.build_embed(records, page, pager.total_pages, is_admin, interaction.user.name),
+                view=self
+            )
+        except discord.errors.NotFound:
+            return
+        except Exception as e:
+            print(f"Error turning records page: {str(e)}")
+            if not interaction.response.is_done():
+                try:
+                    await interaction.response.send_message(
+                        "Failed to load this page. Please run /view_records again.",
+                        ephemeral=True
+                    )
+                except:
+                    pass
+
+    @discord.ui.button(emoji="⬅️", style=discord.ButtonStyle.secondary, custom_id="view_records:previous")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, -1)
+
+    @discord.ui.button(emoji="➡️", style=discord.ButtonStyle.secondary, custom_id="view_records:next")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, 1)
+
+class Reconciler:
+    MANAGED_TYPES = ("A", "AAAA", "CNAME", "NS")
+    DRIFT_CATEGORIES = ("missing_in_cloudflare", "pending_but_live", "pending_conflict", "orphaned_in_cloudflare",
+                        "content_mismatch", "stale_record_id")
+
+    def __init__(self, db: DatabaseManager, cf: CloudflareClient, cf_batch: CloudflareBatcher,
+                 record_cache: Optional[UserRecordCache] = None):
+        self.db = db
+        self.cf = cf
+        self.cf_batch = cf_batch
+        self.record_cache = record_cache
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def normalize_content(record_type: str, content: str) -> str:
+        content = (content or "").strip()
+        if record_type == "AAAA":
             try:
-                if params:
-                    cursor.execute(query, params)
+                return str(ipaddress.IPv6Address(content))
+            except ValueError:
+                return content.lower()
+        if record_type in ("CNAME", "NS"):
+            return content.rstrip(".").lower()
+        return content
+
+    async def _zone_index(self, names: Optional[set] = None) -> dict:
+        # (name_key, record_type) -> [(record id, content)]; a list because Cloudflare allows several
+        # records with the same name and type (round-robin A records).
+        suffix = f".{RECORD_DOMAIN}"
+        index = {}
+
+        def add(record):
+            name, record_type = record["name"].lower(), record["type"]
+            if record_type not in self.MANAGED_TYPES or not name.endswith(suffix):
+                return
+            content = self.normalize_content(record_type, record["content"])
+            index.setdefault((name[:-len(suffix)], record_type), []).append((record["id"], content))
+
+        if names is None:
+            async for record in self.cf.iter_records(per_page=500, priority=PRIORITY_BACKGROUND):
+                add(record)
+            return index
+
+        async def lookup(name):
+            return [record async for record in self.cf.iter_records(name=f"{name}.{RECORD_DOMAIN}",
+                                                                    priority=PRIORITY_BACKGROUND)]
+
+        for records in await asyncio.gather(*(lookup(name) for name in names)):
+            for record in records:
+                add(record)
+        return index
+
+    async def _database_index(self, names: Optional[set] = None) -> dict:
+        query = "SELECT name_key, record_type, content, approved, cf_record_id FROM records"
+        params = None
+        if names is not None:
+            if not names:
+                return {}
+            query += f" WHERE name_key IN ({', '.join('?' * len(names))})"
+            params = tuple(names)
+        index = {}
+        for name_key, record_type, content, approved, cf_record_id in await self.db.execute_query(query, params):
+            # The normalized content is only for comparing; repairs send the stored value.
+            index[(name_key, record_type)] = (approved, cf_record_id,
+                                              self.normalize_content(record_type, content), content)
+        return index
+
+    @staticmethod
+    def _match(cf_entries: list, db_entry: tuple) -> Optional[tuple]:
+        for cf_entry in cf_entries:
+            if cf_entry[0] == db_entry[1]:
+                return cf_entry
+        for cf_entry in cf_entries:
+            if cf_entry[1] == db_entry[2]:
+                return cf_entry
+        return cf_entries[0] if cf_entries else None
+
+    async def run(self, repair: bool = False, full: bool = False) -> dict:
+        async with self.lock:
+            rows = await self.db.execute_query("SELECT COALESCE(MAX(id), 0) FROM record_changes")
+            latest = rows[0][0]
+            # Incremental runs only look at names changed since the last run in any process; the
+            # watermark is shared through the database. Edits made directly in Cloudflare don't show
+            # up there, which is what the periodic full runs are for.
+            rows = await self.db.execute_query("SELECT value FROM reconcile_state WHERE name = 'watermark'")
+            watermark = rows[0][0] if rows else None
+            names = None
+            if not full and watermark is not None:
+                rows = await self.db.execute_query(
+                    "SELECT DISTINCT name_key FROM record_changes WHERE id > ? AND id <= ? AND name_key IS NOT NULL",
+                    (watermark, latest)
+                )
+                names = {row[0] for row in rows}
+                if len(names) > RECONCILE_INCREMENTAL_LIMIT:
+                    names = None
+
+            zone, database, queued = await asyncio.gather(
+                self._zone_index(names),
+                self._database_index(names),
+                self.db.execute_query("SELECT DISTINCT name_key FROM cf_outbox")
+            )
+            # Records with queued outbox changes are expected to differ until the worker catches up.
+            queued = {row[0] for row in queued}
+
+            report = {
+                "full": names is None,
+                "checked": 0,
+                "missing_in_cloudflare": [],
+                "pending_but_live": [],
+                "pending_conflict": [],
+                "orphaned_in_cloudflare": [],
+                "content_mismatch": [],
+                "stale_record_id": [],
+                "repaired": 0,
+                "repair_errors": []
+            }
+            unresolved = set()
+            for key in zone.keys() | database.keys():
+                if key[0] in queued:
+                    unresolved.add(key[0])
+                    continue
+                report["checked"] += 1
+                cf_entries, db_entry = zone.get(key, []), database.get(key)
+                if db_entry is None:
+                    report["orphaned_in_cloudflare"].extend((key, cf_entry) for cf_entry in cf_entries)
+                    continue
+
+                cf_entry = self._match(cf_entries, db_entry)
+                # Further records with the same name and type were not created by the bot.
+                report["orphaned_in_cloudflare"].extend((key, other) for other in cf_entries if other is not cf_entry)
+                if cf_entry is None:
+                    if db_entry[0]:
+                        report["missing_in_cloudflare"].append((key, db_entry))
+                elif not db_entry[0]:
+                    # Only a live record with exactly the requested content can stand in for an approval.
+                    if cf_entry[1] == db_entry[2]:
+                        report["pending_but_live"].append((key, cf_entry))
+                    else:
+                        report["pending_conflict"].append((key, cf_entry, db_entry))
+                elif cf_entry[1] != db_entry[2]:
+                    report["content_mismatch"].append((key, cf_entry, db_entry))
+                elif cf_entry[0] != db_entry[1]:
+                    report["stale_record_id"].append((key, cf_entry))
+
+            if repair:
+                await self._repair(report)
+            for category in self.DRIFT_CATEGORIES:
+                unresolved.update(entry[0][0] for entry in report[category])
+            async with self.db.transaction() as tx:
+                # Names that still differ are logged again, so the next run checks them whichever
+                # process it runs in. Everything up to the watermark has been checked by some run.
+                if unresolved:
+                    await tx.execute_many("INSERT INTO record_changes (name_key) VALUES (?)",
+                                          [(name,) for name in unresolved])
+                await tx.execute_query(
+                    """INSERT INTO reconcile_state (name, value) VALUES ('watermark', ?)
+                       ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)""",
+                    (latest,),
+                    fetch=False
+                )
+                await tx.execute_query(
+                    "DELETE FROM record_changes WHERE id <= (SELECT value FROM reconcile_state WHERE name = 'watermark')",
+                    fetch=False
+                )
+            return report
+
+    async def _repair(self, report: dict):
+        async def guarded(key, operation):
+            try:
+                return key, await operation, None
+            except CloudflareError as cf_error:
+                return key, None, str(cf_error)
+
+        operations = [
+            guarded(key, self.cf_batch.create_record(key[1], f"{key[0]}.{RECORD_DOMAIN}", db_entry[3],
+                                                     priority=PRIORITY_BACKGROUND))
+            for key, db_entry in report["missing_in_cloudflare"]
+        ] + [
+            guarded(key, self.cf_batch.update_record(cf_entry[0], priority=PRIORITY_BACKGROUND, content=db_entry[3]))
+            for key, cf_entry, db_entry in report["content_mismatch"]
+        ]
+        id_updates = [(cf_entry[0], key[0]) for key, cf_entry in report["stale_record_id"]]
+        approvals = [(cf_entry[0], key[0]) for key, cf_entry in report["pending_but_live"]]
+
+        for key, result, error in await asyncio.gather(*operations):
+            if error:
+                report["repair_errors"].append((key, error))
+            else:
+                id_updates.append((result["id"], key[0]))
+
+        if id_updates or approvals:
+            async with self.db.transaction() as tx:
+                if id_updates:
+                    await tx.execute_many(
+                        "UPDATE records SET cf_record_id = ? WHERE name_key = ?",
+                        id_updates
+                    )
+                if approvals:
+                    await tx.execute_many(
+                        "UPDATE records SET approved = 1, cf_record_id = ? WHERE name_key = ?",
+                        approvals
+                    )
+        report["repaired"] = len(id_updates) + len(approvals)
+        if report["repaired"] and self.record_cache is not None:
+            self.record_cache.clear()
+
+    @staticmethod
+    def drift_count(report: dict) -> int:
+        return sum(len(report[category]) for category in Reconciler.DRIFT_CATEGORIES)
+
+    @staticmethod
+    def build_embed(report: dict, repair: bool) -> discord.Embed:
+        drift = Reconciler.drift_count(report)
+        embed = discord.Embed(
+            title="🔄 Reconciliation Results",
+            description=f"""
+            🔍 Records checked: {report['checked']} ({'whole zone' if report['full'] else 'changed since the last run'})
+            ⚠️ Drift found: {drift}
+            🛠️ Repaired: {report['repaired'] if repair else 'report only'}
+            """,
+            color=discord.Color.green() if not drift else discord.Color.orange(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        labels = {
+            "missing_in_cloudflare": "Approved but missing in Cloudflare",
+            "pending_but_live": "Pending in DB but live in Cloudflare",
+            "pending_conflict": "Pending in DB, live in Cloudflare with other content (not repaired)",
+            "orphaned_in_cloudflare": "In Cloudflare only (not repaired)",
+            "content_mismatch": "Content differs",
+            "stale_record_id": "Stale Cloudflare ID"
+        }
+        for category, label in labels.items():
+            entries = report[category]
+            if not entries:
+                continue
+            lines = [f"`{entry[0][0]}` ({entry[0][1]})" for entry in entries[:10]]
+            if len(entries) > 10:
+                lines.append(f"... and {len(entries) - 10} more")
+            embed.add_field(name=f"{label}: {len(entries)}", value="\n".join(lines), inline=False)
+        if report["repair_errors"]:
+            lines = [f"`{key[0]}`: {error}"[:100] for key, error in report["repair_errors"][:10]]
+            embed.add_field(name="Repair errors", value="\n".join(lines), inline=False)
+        return embed
+
+class Lease:
+    # A named lock row with an expiry, kept alive by a heartbeat. Expiry is computed with the
+    # database clock so processes on different hosts agree on it, while the holder only trusts
+    # the lease until its own monotonic deadline, which never outlives the row.
+    ACQUIRE_QUERY = """
+        INSERT INTO leases (name, holder, expires_at)
+        VALUES (?, ?, (julianday('now') - 2440587.5) * 86400.0 + ?)
+        ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+        WHERE leases.holder = excluded.holder
+           OR leases.expires_at < (julianday('now') - 2440587.5) * 86400.0
+        RETURNING holder
+    """
+
+    def __init__(self, db: DatabaseManager, name: str, holder: str, ttl: float = LEASE_TTL,
+                 renew_interval: float = LEASE_RENEW_INTERVAL, on_change=None):
+        self.db = db
+        self.name = name
+        self.holder = holder
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_change = on_change
+        self._valid_until = 0.0
+        self._leader = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def held(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def acquire(self) -> bool:
+        # Acquires a free or expired lease, or renews one this holder already has.
+        started = time.monotonic()
+        rows = await self.db.execute_query(self.ACQUIRE_QUERY, (self.name, self.holder, self.ttl),
+                                           name="lease_acquire")
+        self._valid_until = started + self.ttl if rows else 0.0
+        return bool(rows)
+
+    async def release(self):
+        self._valid_until = 0.0
+        await self.db.execute_query(
+            "DELETE FROM leases WHERE name = ? AND holder = ?",
+            (self.name, self.holder),
+            fetch=False,
+            name="lease_release"
+        )
+
+    def start(self):
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        self._closed = True
+        self._wake.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                print(f"Timed out waiting for the {self.name} lease heartbeat to stop")
+            self._task = None
+        await self._update(False)
+        if self.held:
+            try:
+                await self.release()
+            except Exception as e:
+                print(f"Failed to release the {self.name} lease: {e}")
+
+    async def _update(self, leader: bool):
+        if leader == self._leader:
+            return
+        self._leader = leader
+        METRICS.gauge_add("lease_held", 1 if leader else -1, lease=self.name)
+        if self.on_change:
+            try:
+                await self.on_change(leader)
+            except Exception as e:
+                print(f"Error handling a change of the {self.name} lease: {e}")
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await self.acquire()
+            except Exception as e:
+                print(f"Failed to renew the {self.name} lease: {e}")
+            await self._update(self.held)
+            # Wake up no later than the deadline so a holder that cannot renew steps down in time.
+            timeout = self.renew_interval
+            if self.held:
+                timeout = min(timeout, self._valid_until - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+class LogSink:
+    # Coalesces log channel events into periodic digests so a burst of commands
+    # costs a handful of messages instead of one send per event.
+    DESCRIPTION_LIMIT = 4000
+
+    def __init__(self, bot, channel_id: int, interval: float = LOG_FLUSH_INTERVAL,
+                 max_events: int = LOG_DIGEST_SIZE, max_queue: int = LOG_QUEUE_SIZE):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.interval = interval
+        self.max_events = max_events
+        self.queue = deque(maxlen=max_queue)
+        self.dropped = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _put(self, item):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+            METRICS.inc("log_events_dropped_total")
+        self.queue.append(item)
+        if len(self.queue) >= self.max_events:
+            self._wake.set()
+
+    def log(self, message: str):
+        self._put((datetime.datetime.utcnow(), message))
+
+    def log_embed(self, embed: discord.Embed):
+        self._put(embed)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        # The worker is woken rather than cancelled so a digest isn't cut off mid-send.
+        self._closed = True
+        self._wake.set()
+        try:
+            if self._task is not None:
+                await asyncio.wait_for(self._task, timeout)
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Timed out flushing {len(self.queue)} log events on shutdown")
+        self._task = None
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Failed to flush log events: {e}")
+
+    def _digest(self, lines: List[str]) -> discord.Embed:
+        embed = discord.Embed(
+            title="Activity Log",
+            description="\n".join(lines),
+            color=discord.Color.blurple(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        footer = f"{len(lines)} events"
+        if self.dropped:
+            footer += f" | {self.dropped} dropped while the queue was full"
+            self.dropped = 0
+        embed.set_footer(text=footer)
+        return embed
+
+    async def flush(self):
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return
+        # Sends go out one at a time; discord.py waits out any rate limit on the channel.
+        lines, size = [], 0
+        while self.queue:
+            item = self.queue[0]
+            if isinstance(item, discord.Embed):
+                if lines:
+                    await self._send(channel, self._digest(lines))
+                    lines, size = [], 0
+                self.queue.popleft()
+                await self._send(channel, item)
+                continue
+            created_at, message = item
+            line = f"`{created_at.strftime('%H:%M:%S')}` {message}"[:1000]
+            if lines and size + len(line) + 1 > self.DESCRIPTION_LIMIT:
+                await self._send(channel, self._digest(lines))
+                lines, size = [], 0
+            self.queue.popleft()
+            lines.append(line)
+            size += len(line) + 1
+        if lines:
+            await self._send(channel, self._digest(lines))
+
+    async def _send(self, channel, embed: discord.Embed):
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"Failed to send log digest: {e}")
+
+class CloudflareOutbox:
+    # Cloudflare changes are written here in the same transaction as the database change
+    # and applied by a background worker, so commands never wait on Cloudflare. Entries
+    # for one record name are applied strictly in the order they were queued.
+    def __init__(self, db: DatabaseManager, cf: CloudflareClient, cf_batch: CloudflareBatcher,
+                 record_cache: UserRecordCache, log_sink: LogSink, notify, lease: Optional[Lease] = None,
+                 batch_size: int = OUTBOX_BATCH_SIZE, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.db = db
+        self.cf = cf
+        self.cf_batch = cf_batch
+        self.record_cache = record_cache
+        self.log_sink = log_sink
+        self.notify = notify
+        self.lease = lease
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.breaker = CircuitBreaker(OUTBOX_BREAKER_THRESHOLD, OUTBOX_BREAKER_RESET)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._notifications = set()
+        self._notify_lock = asyncio.Lock()
+
+    @staticmethod
+    async def enqueue(tx: Transaction, entries: List[tuple]):
+        # entries are (action, name_key, record_type, content, cf_record_id, userid, requested_by, priority).
+        await tx.execute_many(
+            """INSERT INTO cf_outbox
+               (action, name_key, record_type, content, cf_record_id, userid, requested_by, priority)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            entries
+        )
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        # Unapplied entries stay in the table and are picked up on the next start.
+        self._closed = True
+        self._wake.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                print("Timed out waiting for the Cloudflare outbox worker to stop")
+            self._task = None
+        if self._notifications:
+            _, pending = await asyncio.wait(self._notifications, timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    async def depth(self) -> tuple:
+        rows = await self.db.execute_query("SELECT COUNT(*), MIN(created_at) FROM cf_outbox")
+        return rows[0] if rows else (0, None)
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                processed = await self.drain()
+            except Exception as e:
+                print(f"Cloudflare outbox worker error: {e}")
+                processed = 0
+            if processed:
+                continue
+            timeout = self.poll_interval
+            if not self.breaker.allow():
+                timeout = max(self.breaker.retry_in, 0.1)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _apply(self, entry: tuple) -> tuple:
+        _, action, name_key, record_type, content, record_id, _, _, attempts, priority = entry
+        fqdn = f"{name_key}.{RECORD_DOMAIN}"
+        try:
+            if action == "create":
+                if attempts:
+                    # An earlier attempt may have been applied before it failed.
+                    result = await self.cf.create_record(record_type, fqdn, content, priority=priority,
+                                                         check_existing=True)
                 else:
-                    cursor.execute(query)
-                conn.commit()
-                if fetch:
-                    return cursor.fetchall()
-                return cursor
+                    result = await self.cf_batch.create_record(record_type, fqdn, content, priority=priority)
+            else:
+                if not record_id:
+                    cf_record = await self.cf.find_record(fqdn, record_type, priority)
+                    if cf_record is None:
+                        return entry, {"id": None}, None
+                    record_id = cf_record["id"]
+                result = await self.cf_batch.delete_record(record_id, priority=priority)
+        except CloudflareError as e:
+            if action == "delete" and e.status == 404:
+                return entry, {"id": record_id}, None
+            return entry, None, e
+        return entry, result, None
+
+    async def drain(self) -> int:
+        # Only the process holding the jobs lease may apply entries; a standby would race it.
+        if self.lease is not None and not self.lease.held:
+            return 0
+        if not self.breaker.allow():
+            return 0
+        entries = await self.db.execute_query(
+            """SELECT id, action, name_key, record_type, content, cf_record_id, userid, requested_by, attempts, priority
+               FROM cf_outbox AS entry
+               WHERE next_attempt_at <= ?
+                 AND id = (SELECT MIN(id) FROM cf_outbox WHERE name_key = entry.name_key)
+               ORDER BY priority, id
+               LIMIT ?""",
+            (time.time(), 1 if self.breaker.state == "half_open" else self.batch_size)
+        )
+        if not entries:
+            return 0
+        # Count the attempt before calling Cloudflare: if recording the outcome fails afterwards,
+        # the retry then looks for the record it may already have created instead of posting it again.
+        await self.db.execute_many(
+            "UPDATE cf_outbox SET attempts = attempts + 1 WHERE id = ?",
+            [(entry[0],) for entry in entries]
+        )
+
+        done, retry, failed = [], [], []
+        for entry, result, error in await asyncio.gather(*(self._apply(entry) for entry in entries)):
+            if error is None:
+                self.breaker.record_success()
+                done.append((entry, result))
+            elif error.transient:
+                if self.breaker.record_failure():
+                    self.log_sink.log(
+                        f"Cloudflare is failing ({error}); pausing the outbox for {self.breaker.reset_timeout:.0f}s"
+                    )
+                retry.append((entry, error))
+            else:
+                failed.append((entry, error))
+
+        created = [(result["id"], entry[2]) for entry, result in done if entry[1] == "create"]
+        reverted = [(entry[2],) for entry, _ in failed if entry[1] == "create"]
+        async with self.db.transaction() as tx:
+            if created:
+                await tx.execute_many(
+                    "UPDATE records SET cf_record_id = ? WHERE name_key = ? AND approved = 1",
+                    created
+                )
+            if reverted:
+                # Nothing was created, so the record goes back to waiting for approval.
+                await tx.execute_many(
+                    "UPDATE records SET approved = 0 WHERE name_key = ? AND cf_record_id IS NULL",
+                    reverted
+                )
+            if retry:
+                now = time.time()
+                await tx.execute_many(
+                    "UPDATE cf_outbox SET last_error = ?, next_attempt_at = ? WHERE id = ?",
+                    [
+                        (str(error)[:500],
+                         now + min(OUTBOX_RETRY_MAX, OUTBOX_RETRY_BASE * 2 ** entry[8]) * random.uniform(0.5, 1.0),
+                         entry[0])
+                        for entry, error in retry
+                    ]
+                )
+            if done or failed:
+                await tx.execute_many(
+                    "DELETE FROM cf_outbox WHERE id = ?",
+                    [(entry[0],) for entry, _ in done + failed]
+                )
+        if created or reverted:
+            self.record_cache.invalidate(*{entry[6] for entry, _ in done + failed if entry[1] == "create"})
+
+        live = {}
+        for entry, _ in done:
+            _, action, name_key, record_type, content, _, userid, requested_by, _, _ = entry
+            if action == "create":
+                live.setdefault(userid, []).append(entry)
+                self.log_sink.log(f"Record approved: ``{name_key}`` ``({record_type})`` -> ``{content}`` by <@{requested_by}>")
+            else:
+                self.log_sink.log(f"Record deleted: ``{name_key}`` by <@{requested_by}>")
+        for entry, error in failed:
+            if entry[1] == "create":
+                self.log_sink.log(f"Failed to create ``{entry[2]}`` in Cloudflare, it is pending approval again: {error}")
+            else:
+                self.log_sink.log(f"Failed to delete ``{entry[2]}`` from Cloudflare: {error}")
+
+        messages = {}
+        for userid, user_entries in live.items():
+            user_embed = discord.Embed(
+                title="DNS Record Approved" if len(user_entries) == 1 else "DNS Records Approved",
+                description="Your DNS records have been approved and created in Cloudflare.",
+                color=discord.Color.green(),
+                timestamp=datetime.datetime.utcnow()
+            )
+            for entry in user_entries[:25]:
+                user_embed.add_field(name=entry[2], value=f"`{entry[3]}` -> `{entry[4]}`", inline=False)
+            messages[userid] = {"embed": user_embed}
+        if messages:
+            # DMs can be slow or fail user by user; they must not hold up the next batch of changes.
+            task = asyncio.create_task(self._send_notifications(messages))
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+
+        return len(entries)
+
+    async def _send_notifications(self, messages: dict):
+        # One batch of DMs at a time, so a backlog can't multiply the number of DMs in flight.
+        async with self._notify_lock:
+            try:
+                await self.notify(messages)
             except Exception as e:
-                print(f"Query execution error: {e}")
-                raise
+                print(f"Failed to send outbox notifications: {e}")
 
 class DNSBot(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = DatabaseManager()
+        self.cf = CloudflareClient(CF_API_URL, ZONE_ID, CF_API_KEY, CF_EMAIL, metrics=METRICS,
+                                   rate_limit=CF_RATE_LIMIT, burst=CF_BURST, max_retries=CF_MAX_RETRIES)
+        self.cf_batch = CloudflareBatcher(self.cf)
+        self.record_cache = UserRecordCache(self.db, shared=getattr(bot, "shard_ids", None) is not None)
+        self.paginator = RecordPaginator(self.db, self.record_cache)
+        self.reconciler = Reconciler(self.db, self.cf, self.cf_batch, self.record_cache)
+        self.metrics_server = MetricsServer(METRICS, METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+        self.log_sink = LogSink(bot, LOG_CHANNEL_ID)
+        self.prepare_task: Optional[asyncio.Task] = None
+        # Garbage collection, reconciliation and the outbox worker must only run in one process
+        # when the bot is split across several; whichever holds the jobs lease runs them.
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self.lease = Lease(self.db, "jobs", self.instance_id, on_change=self.set_leader)
+        self.outbox = CloudflareOutbox(self.db, self.cf, self.cf_batch, self.record_cache, self.log_sink,
+                                       self.send_direct_messages, self.lease)
+
+    async def cog_load(self):
+        self.bot.add_view(self.paginator)
+        # The schema check and pool warm-up run while the bot logs in to the gateway;
+        # anything that needs the database before then waits for them.
+        self.prepare_task = asyncio.create_task(self.prepare_database())
+        self.log_sink.start()
+        self.lease.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                print(f"Failed to start metrics server: {e}")
+
+    async def prepare_database(self):
+        try:
+            await self.db.warm_up()
+        except Exception as e:
+            print(f"Failed to prepare the database: {e}")
+
+    async def set_leader(self, leader: bool):
+        if leader:
+            print(f"{self.instance_id} now runs the scheduled jobs")
+            self.outbox.start()
+            if not self.scheduled_garbage_collector.is_running():
+                self.scheduled_garbage_collector.start()
+            if not self.scheduled_reconcile.is_running():
+                self.scheduled_reconcile.start()
+        else:
+            print(f"{self.instance_id} stopped running the scheduled jobs")
+            self.scheduled_garbage_collector.cancel()
+            self.scheduled_reconcile.cancel()
+            await self.outbox.close()
+
+    async def cog_unload(self):
+        if self.prepare_task is not None and not self.prepare_task.done():
+            self.prepare_task.cancel()
+        await self.lease.close()
+        self.scheduled_garbage_collector.cancel()
+        self.scheduled_reconcile.cancel()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await self.outbox.close()
+        await self.log_sink.close()
+        await self.cf_batch.close()
+        await self.cf.close()
+        await self.db.close()
+
+    async def send_direct_messages(self, messages: dict, on_progress=None):
+        # discord.py already waits out per-route rate limits; this only bounds how many DMs are in flight.
+        semaphore = asyncio.Semaphore(DM_CONCURRENCY)
+        sent, failed = 0, 0
+
+        async def deliver(user_id, kwargs):
+            nonlocal sent, failed
+            async with semaphore:
+                try:
+                    user = self.bot.get_user(int(user_id)) or await self.bot.fetch_user(int(user_id))
+                    await user.send(**kwargs)
+                    sent += 1
+                except Exception as user_error:
+                    failed += 1
+                    print(f"Failed to send message to user {user_id}: {str(user_error)}")
+            if on_progress:
+                await on_progress(sent, failed)
+
+        await asyncio.gather(*(deliver(user_id, kwargs) for user_id, kwargs in messages.items()))
+        return sent, failed
+
+    async def collect_garbage(self, sample_size: int = 10):
+        # Delete in bounded chunks so a large backlog never holds the write lock for long.
+        deleted, sample = 0, []
+        while True:
+            rows = await self.db.execute_query(
+                """
+                DELETE FROM records
+                WHERE rowid IN (
+                    SELECT rowid FROM records
+                    WHERE approved = 0
+                    AND created_at < DATETIME('now', ?)
+                    LIMIT ?
+                )
+                RETURNING record_name, record_type, content, userid, created_at
+                """,
+                (f"-{GC_RETENTION_DAYS} day", GC_CHUNK_SIZE)
+            )
+            deleted += len(rows)
+            if rows:
+                self.record_cache.invalidate(*{row[3] for row in rows})
+            sample.extend(rows[:sample_size - len(sample)])
+            if len(rows) < GC_CHUNK_SIZE:
+                return deleted, sample
+
+    def garbage_collector_log_embed(self, deleted: int, executed_by: str) -> discord.Embed:
+        return discord.Embed(
+            title="Garbage Collector Executed",
+            description=f"""
+            🗑️ Cleanup performed by {executed_by}
+            📊 Records deleted: {deleted}
+            📅 Cutoff date: {(datetime.datetime.utcnow() - datetime.timedelta(days=GC_RETENTION_DAYS)).strftime('%Y-%m-%d')}
+            """,
+            color=discord.Color.orange(),
+            timestamp=datetime.datetime.utcnow()
+        )
+
+    @tasks.loop(hours=GC_INTERVAL_HOURS)
+    async def scheduled_garbage_collector(self):
+        try:
+            deleted, _ = await self.collect_garbage()
+        except Exception as e:
+            print(f"Database error in scheduled garbage collector: {str(e)}")
+            return
+
+        if deleted:
+            self.log_sink.log_embed(self.garbage_collector_log_embed(deleted, "the scheduler"))
+
+    @scheduled_garbage_collector.before_loop
+    async def before_scheduled_garbage_collector(self):
+        await self.bot.wait_until_ready()
+
+    async def run_reconciler(self, repair: bool, full: bool = False) -> Optional[dict]:
+        # Repairs write to Cloudflare and Reconciler.lock only covers this process, so across
+        # shard processes they are serialized by a lease. Returns None if another repair holds it.
+        if not repair:
+            return await self.reconciler.run(repair=False, full=full)
+        lease = Lease(self.db, "reconcile", f"{self.instance_id}:{secrets.token_hex(4)}")
+        if not await lease.acquire():
+            return None
+        lease.start()
+        try:
+            return await self.reconciler.run(repair=True, full=full)
+        finally:
+            await lease.close()
+
+    @tasks.loop(hours=RECONCILE_INTERVAL_HOURS)
+    async def scheduled_reconcile(self):
+        try:
+            full = self.scheduled_reconcile.current_loop % RECONCILE_FULL_EVERY == 0
+            report = await self.run_reconciler(repair=RECONCILE_AUTO_REPAIR, full=full)
+        except Exception as e:
+            print(f"Error in scheduled reconciliation: {str(e)}")
+            return
+        if report is None:
+            print("Skipped scheduled reconciliation: a repair is already running in another process")
+            return
+
+        if Reconciler.drift_count(report):
+            self.log_sink.log_embed(Reconciler.build_embed(report, RECONCILE_AUTO_REPAIR))
+
+    @scheduled_reconcile.before_loop
+    async def before_scheduled_reconcile(self):
+        await self.bot.wait_until_ready()
 
     @app_commands.command(name="ping", description="Check the bot's latency")
+    @instrumented("ping")
     async def ping(self, interaction: discord.Interaction):
         try:
             try:
@@ -127,6 +1755,15 @@ class DNSBot(commands.Cog):
                     inline=False
                 )
 
+            if any(role.id == ADMIN_ROLE_ID for role in getattr(interaction.user, "roles", [])):
+                cache_stats = self.record_cache.stats()
+                embed.add_field(
+                    name="Record Cache",
+                    value=f"`{cache_stats['hits']}` hits / `{cache_stats['misses']}` misses "
+                          f"({cache_stats['hit_ratio']:.0%}), `{cache_stats['entries']}` users cached",
+                    inline=False
+                )
+
             await interaction.response.send_message(embed=embed)
 
         except discord.errors.NotFound:
@@ -146,49 +1783,24 @@ class DNSBot(commands.Cog):
                     pass
 
     @app_commands.command(name="create_record", description="Create a DNS record")
+    @instrumented("create_record")
+    @throttled("create_record")
     async def create_record(self, interaction: discord.Interaction, record_name: str, record_type: str, content: str):
         try:
             record_type = record_type.upper()
             record_name = record_name.strip().lower()
             content = content.strip()
 
-            if record_type not in ["A", "AAAA", "CNAME", "NS"]:
+            if record_type not in RECORD_TYPES:
                 await interaction.response.send_message(
                     "Invalid record type. Supported types: A, AAAA, CNAME, NS.",
                     ephemeral=True
                 )
                 return
 
-            content_valid = True
-            error_message = ""
+            error_message = validate_record(record_type, content)
 
-            if record_type == "A":
-                ip_pattern = r'^(\d{1,3}\.){3}\d{1,3}$'
-                if not re.match(ip_pattern, content):
-                    content_valid = False
-                    error_message = "Invalid IPv4 address format. Example: 192.168.1.1"
-                else:
-                    octets = content.split('.')
-                    for octet in octets:
-                        if not (0 <= int(octet) <= 255):
-                            content_valid = False
-                            error_message = "IPv4 address octets must be between 0 and 255"
-                            break
-
-            elif record_type == "AAAA":
-                try:
-                    ipaddress.IPv6Address(content)
-                except ValueError:
-                    content_valid = False
-                    error_message = "Invalid IPv6 address format. Example: 2001:0db8:85a3:0000:0000:8a2e:0370:7334"
-
-            elif record_type in ["CNAME", "NS"]:
-                domain_pattern = r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$'
-                if not re.match(domain_pattern, content):
-                    content_valid = False
-                    error_message = f"Invalid domain format for {record_type} record. Example: example.com"
-
-            if not content_valid:
+            if error_message:
                 error_embed = discord.Embed(
                     title="Content Validation Error",
                     description=error_message,
@@ -197,12 +1809,7 @@ class DNSBot(commands.Cog):
                 )
                 error_embed.add_field(
                     name="Record Type Format",
-                    value=f"Format for {record_type} record:\n" + {
-                        "A": "IPv4 address (e.g., 192.168.1.1)",
-                        "AAAA": "IPv6 address (e.g., 2001:0db8:85a3:0000:0000:8a2e:0370:7334)",
-                        "CNAME": "Domain name (e.g., example.com)",
-                        "NS": "Nameserver domain (e.g., ns1.example.com)"
-                    }[record_type],
+                    value=f"Format for {record_type} record:\n" + RECORD_FORMATS[record_type],
                     inline=False
                 )
                 await interaction.response.send_message(embed=error_embed, ephemeral=True)
@@ -213,23 +1820,24 @@ class DNSBot(commands.Cog):
             )
 
             try:
-                existing = await self.db.execute_query(
-                    "SELECT record_name FROM records WHERE LOWER(record_name) = ? AND userid = ?",
-                    (record_name, str(interaction.user.id))
+                inserted = await self.db.execute_query(
+                    """INSERT INTO records 
+                       (userid, record_name, name_key, record_type, content, approved, created_at) 
+                       VALUES (?, ?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
+                       ON CONFLICT(name_key) DO NOTHING
+                       RETURNING rowid""",
+                    (str(interaction.user.id), record_name, record_name, record_type, content)
                 )
 
-                if existing:
+                if not inserted:
+                    owned = record_name in (await self.record_cache.get(str(interaction.user.id)))["names"]
                     await interaction.edit_original_response(
                         content="You already have a pending record with this name."
+                        if owned else "This record name is already taken."
                     )
                     return
 
-                await self.db.execute_query(
-                    """INSERT INTO records 
-                       (userid, record_name, record_type, content, approved, created_at) 
-                       VALUES (?, ?, ?, ?, 0, CURRENT_TIMESTAMP)""",
-                    (str(interaction.user.id), record_name, record_type, content)
-                )
+                self.record_cache.invalidate(interaction.user.id)
 
                 embed = discord.Embed(
                     title="Record Created Successfully",
@@ -249,11 +1857,7 @@ class DNSBot(commands.Cog):
 
                 await interaction.edit_original_response(content=None, embed=embed)
 
-                log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    await log_channel.send(
-                        f"Record created: ``{record_name}`` ``({record_type})`` -> ``{content}`` by <@{interaction.user.id}>"
-                    )
+                self.log_sink.log(f"Record created: ``{record_name}`` ``({record_type})`` -> ``{content}`` by <@{interaction.user.id}>")
 
             except Exception as db_error:
                 error_embed = discord.Embed(
@@ -281,6 +1885,8 @@ class DNSBot(commands.Cog):
                 print(f"Critical error in create_record: {str(e)}")
 
     @app_commands.command(name="delete_record", description="Delete a DNS record")
+    @instrumented("delete_record")
+    @throttled("delete_record")
     async def delete_record(self, interaction: discord.Interaction, record_name: str):
         try:
             await interaction.response.send_message(
@@ -291,7 +1897,7 @@ class DNSBot(commands.Cog):
 
             try:
                 record = await self.db.execute_query(
-                    "SELECT userid, approved, record_type, content FROM records WHERE LOWER(record_name) = ?",
+                    "SELECT userid, approved, record_type, content, cf_record_id FROM records WHERE name_key = ?",
                     (record_name,)
                 )
 
@@ -301,7 +1907,7 @@ class DNSBot(commands.Cog):
                     )
                     return
 
-                record_owner_id, approved, record_type, content = record[0]
+                record_owner_id, approved, record_type, content, record_id = record[0]
 
                 if approved == 0:
                     await interaction.edit_original_response(
@@ -318,79 +1924,249 @@ class DNSBot(commands.Cog):
                     )
                     return
 
-                try:
-                    headers = {
-                        "Authorization": f"Bearer {CF_API_KEY}",
-                        "X-Auth-Email": CF_EMAIL
-                    }
-                    
-                    cf_response = requests.get(
-                        f"{CF_API_URL}/{ZONE_ID}/dns_records",
-                        headers=headers
-                    ).json()
-
-                    record_id = next(
-                        (r["id"] for r in cf_response["result"] 
-                         if r["name"] == f"{record_name}.is-app.top"),
-                        None
-                    )
+                async with self.db.transaction() as tx:
+                    deleted = await tx.execute_query(
+                        "DELETE FROM records WHERE name_key = ? AND approved = 1 RETURNING cf_record_id",
+                        (record_name,)
+                    )
+                    if deleted:
+                        await self.outbox.enqueue(tx, [(
+                            "delete", record_name, record_type, content, deleted[0][0], record_owner_id,
+                            str(interaction.user.id), PRIORITY_INTERACTIVE
+                        )])
+
+                if not deleted:
+                    await interaction.edit_original_response(
+                        content="This record does not exist in the database."
+                    )
+                    return
+
+                self.outbox.wake()
+                self.record_cache.invalidate(record_owner_id)
+
+                embed = discord.Embed(
+                    title="Record Deleted Successfully",
+                    description=f"The record has been removed from the database and is being removed from Cloudflare.",
+                    color=discord.Color.red(),
+                    timestamp=datetime.datetime.utcnow()
+                )
+                embed.add_field(name="Record Name", value=f"`{record_name}`", inline=True)
+                embed.add_field(name="Type", value=f"`{record_type}`", inline=True)
+                embed.add_field(name="Content", value=f"`{content}`", inline=True)
+                embed.set_footer(text=f"Deleted by {interaction.user.name}")
+
+                await interaction.edit_original_response(content=None, embed=embed)
+
+            except Exception as db_error:
+                error_embed = discord.Embed(
+                    title="Database Error",
+                    description=f"Failed to delete record: {str(db_error)}",
+                    color=discord.Color.red()
+                )
+                await interaction.edit_original_response(content=None, embed=error_embed)
+                print(f"Database error in delete_record: {str(db_error)}")
+
+        except discord.errors.NotFound:
+            return
+        except Exception as e:
+            try:
+                error_embed = discord.Embed(
+                    title="Error",
+                    description=f"An unexpected error occurred: {str(e)}",
+                    color=discord.Color.red()
+                )
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(embed=error_embed)
+                else:
+                    await interaction.edit_original_response(content=None, embed=error_embed)
+            except:
+                print(f"Critical error in delete_record: {str(e)}")
+
+    @app_commands.command(name="approve", description="Approve a DNS record")
+    @instrumented("approve")
+    async def approve(self, interaction: discord.Interaction, record_name: str):
+        try:
+            if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+                await interaction.response.send_message(
+                    "You do not have permission to approve records.",
+                    ephemeral=True
+                )
+                return
+
+            await interaction.response.send_message(
+                f"Processing approval for record: `{record_name}`...",
+                ephemeral=True
+            )
+
+            record_name = record_name.strip().lower()
+
+            try:
+                async with self.db.transaction() as tx:
+                    record = await tx.execute_query(
+                        """UPDATE records SET approved = 1
+                           WHERE name_key = ? AND approved = 0
+                           RETURNING record_name, record_type, content, userid""",
+                        (record_name,)
+                    )
+                    if record:
+                        await self.outbox.enqueue(tx, [(
+                            "create", record_name, record[0][1], record[0][2], None, record[0][3],
+                            str(interaction.user.id), PRIORITY_INTERACTIVE
+                        )])
+
+                if not record:
+                    await interaction.edit_original_response(
+                        content="Record not found or already approved."
+                    )
+                    return
+
+                record_name, record_type, content, record_owner_id = record[0]
+                self.outbox.wake()
+                self.record_cache.invalidate(record_owner_id)
+
+                embed = discord.Embed(
+                    title="Record Approved Successfully",
+                    description=f"Record `{record_name}` has been approved and will be created in Cloudflare shortly.",
+                    color=discord.Color.green(),
+                    timestamp=datetime.datetime.utcnow()
+                )
+                embed.add_field(name="Record Name", value=f"`{record_name}`", inline=True)
+                embed.add_field(name="Type", value=f"`{record_type}`", inline=True)
+                embed.add_field(name="Content", value=f"`{content}`", inline=True)
+                embed.add_field(
+                    name="Status",
+                    value="⏳ Queued for Cloudflare, the owner is notified once it's live",
+                    inline=False
+                )
+                embed.set_footer(text=f"Approved by {interaction.user.name}")
+
+                await interaction.edit_original_response(content=None, embed=embed)
+
+            except Exception as db_error:
+                error_embed = discord.Embed(
+                    title="Database Error",
+                    description=f"Failed to approve record: {str(db_error)}",
+                    color=discord.Color.red()
+                )
+                await interaction.edit_original_response(content=None, embed=error_embed)
+                print(f"Database error in approve command: {str(db_error)}")
+
+        except discord.errors.NotFound:
+            return
+        except Exception as e:
+            try:
+                error_embed = discord.Embed(
+                    title="Error",
+                    description=f"An unexpected error occurred: {str(e)}",
+                    color=discord.Color.red()
+                )
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(embed=error_embed, ephemeral=True)
+                else:
+                    await interaction.edit_original_response(content=None, embed=error_embed)
+            except:
+                print(f"Critical error in approve command: {str(e)}")
+
+    @app_commands.command(name="approve_bulk", description="Approve pending DNS records in bulk (Admin only)")
+    @instrumented("approve_bulk")
+    @app_commands.describe(
+        user="Only approve records requested by this user",
+        older_than_days="Only approve records pending for at least this many days",
+        record_names="Comma-separated list of record names to approve"
+    )
+    async def approve_bulk(self, interaction: discord.Interaction, user: Optional[discord.User] = None,
+                           older_than_days: Optional[app_commands.Range[int, 0, 365]] = None,
+                           record_names: Optional[str] = None):
+        try:
+            if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+                await interaction.response.send_message(
+                    "You do not have permission to approve records.",
+                    ephemeral=True
+                )
+                return
+
+            names = [name.strip().lower() for name in (record_names or "").split(",") if name.strip()]
+            if user is None and older_than_days is None and not names:
+                await interaction.response.send_message(
+                    "Please provide at least one filter: user, older_than_days or record_names.",
+                    ephemeral=True
+                )
+                return
 
-                    if not record_id:
-                        await interaction.edit_original_response(
-                            content="Record not found in Cloudflare. Please contact an admin for assistance."
-                        )
-                        return
+            await interaction.response.send_message(
+                "Processing bulk approval...",
+                ephemeral=True
+            )
 
-                    delete_response = requests.delete(
-                        f"{CF_API_URL}/{ZONE_ID}/dns_records/{record_id}",
-                        headers=headers
+            try:
+                conditions, params = ["approved = 0"], []
+                if user is not None:
+                    conditions.append("userid = ?")
+                    params.append(str(user.id))
+                if older_than_days is not None:
+                    conditions.append("created_at < DATETIME('now', ?)")
+                    params.append(f"-{older_than_days} day")
+                if names:
+                    conditions.append(f"name_key IN ({', '.join('?' for _ in names)})")
+                    params.extend(names)
+                params.append(BULK_APPROVE_LIMIT)
+
+                async with self.db.transaction() as tx:
+                    records = await tx.execute_query(
+                        f"""UPDATE records SET approved = 1
+                            WHERE rowid IN (
+                                SELECT rowid FROM records
+                                WHERE {' AND '.join(conditions)}
+                                ORDER BY created_at
+                                LIMIT ?
+                            )
+                            RETURNING name_key, record_type, content, userid""",
+                        tuple(params)
                     )
+                    if records:
+                        await self.outbox.enqueue(tx, [
+                            ("create", name_key, record_type, content, None, userid,
+                             str(interaction.user.id), PRIORITY_BACKGROUND)
+                            for name_key, record_type, content, userid in records
+                        ])
 
-                    if delete_response.status_code != 200:
-                        error_data = delete_response.json()
-                        await interaction.edit_original_response(
-                            content=f"Failed to delete record in Cloudflare: {error_data.get('errors', ['Unknown error'])[0]}"
-                        )
-                        return
-
-                except requests.RequestException as cf_error:
+                if not records:
                     await interaction.edit_original_response(
-                        content=f"Failed to communicate with Cloudflare: {str(cf_error)}"
+                        content="No pending records match these filters."
                     )
                     return
 
-                await self.db.execute_query(
-                    "DELETE FROM records WHERE LOWER(record_name) = ?",
-                    (record_name,)
-                )
+                self.outbox.wake()
+                self.record_cache.invalidate(*{record[3] for record in records})
 
                 embed = discord.Embed(
-                    title="Record Deleted Successfully",
-                    description=f"The record has been removed from both Cloudflare and the database.",
-                    color=discord.Color.red(),
+                    title="Bulk Approval Results",
+                    description=f"""
+                    ✅ Approved: {len(records)}
+                    👥 Owners: {len({record[3] for record in records})}
+                    ⏳ Queued for Cloudflare, owners are notified once their records are live
+                    """,
+                    color=discord.Color.green(),
                     timestamp=datetime.datetime.utcnow()
                 )
-                embed.add_field(name="Record Name", value=f"`{record_name}`", inline=True)
-                embed.add_field(name="Type", value=f"`{record_type}`", inline=True)
-                embed.add_field(name="Content", value=f"`{content}`", inline=True)
-                embed.set_footer(text=f"Deleted by {interaction.user.name}")
+                lines = [f"`{record[0]}` ({record[1]})" for record in records[:15]]
+                if len(records) > 15:
+                    lines.append(f"... and {len(records) - 15} more")
+                embed.add_field(name="Approved", value="\n".join(lines), inline=False)
+                embed.set_footer(text=f"Approved by {interaction.user.name}")
 
                 await interaction.edit_original_response(content=None, embed=embed)
 
-                log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    await log_channel.send(
-                        f"Record deleted: ``{record_name}`` by <@{interaction.user.id}>"
-                    )
+                self.log_sink.log(f"Bulk approval: {len(records)} records queued by <@{interaction.user.id}>")
 
             except Exception as db_error:
                 error_embed = discord.Embed(
                     title="Database Error",
-                    description=f"Failed to delete record: {str(db_error)}",
+                    description=f"Failed to approve records: {str(db_error)}",
                     color=discord.Color.red()
                 )
                 await interaction.edit_original_response(content=None, embed=error_embed)
-                print(f"Database error in delete_record: {str(db_error)}")
+                print(f"Database error in approve_bulk command: {str(db_error)}")
 
         except discord.errors.NotFound:
             return
@@ -402,125 +2178,317 @@ class DNSBot(commands.Cog):
                     color=discord.Color.red()
                 )
                 if not interaction.response.is_done():
-                    await interaction.response.send_message(embed=error_embed)
+                    await interaction.response.send_message(embed=error_embed, ephemeral=True)
                 else:
                     await interaction.edit_original_response(content=None, embed=error_embed)
             except:
-                print(f"Critical error in delete_record: {str(e)}")
-
-    @app_commands.command(name="approve", description="Approve a DNS record")
-    async def approve(self, interaction: discord.Interaction, record_name: str):
+                print(f"Critical error in approve_bulk command: {str(e)}")
+
+    async def import_batch(self, batch: List[tuple], pending_limit: Optional[int] = None) -> tuple:
+        # batch rows are (line_no, owner, name, type, content); returns (imported rows, taken rows,
+        # rows over the limit). With a pending_limit all rows belong to one owner, who may hold at
+        # most that many pending records, so an import can't reserve names in bulk.
+        names = [row[2] for row in batch]
+        async with self.db.transaction() as tx:
+            existing = await tx.execute_query(
+                f"SELECT name_key FROM records WHERE name_key IN ({', '.join('?' for _ in names)})",
+                tuple(names)
+            )
+            taken = {row[0] for row in existing}
+            fresh = [row for row in batch if row[2] not in taken]
+            over_limit = []
+            if pending_limit is not None and fresh:
+                pending = await tx.execute_query(
+                    "SELECT COUNT(*) FROM records WHERE userid = ? AND approved = 0",
+                    (fresh[0][1],)
+                )
+                allowed = max(0, pending_limit - pending[0][0])
+                fresh, over_limit = fresh[:allowed], fresh[allowed:]
+            if fresh:
+                await tx.execute_many(
+                    """INSERT INTO records
+                       (userid, record_name, name_key, record_type, content, approved, created_at)
+                       VALUES (?, ?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
+                       ON CONFLICT(name_key) DO NOTHING""",
+                    [(owner, name, name, record_type, content) for _, owner, name, record_type, content in fresh]
+                )
+        return fresh, [row for row in batch if row[2] in taken], over_limit
+
+    @app_commands.command(name="import_records", description="Import DNS records from a CSV, JSON or zone file")
+    @instrumented("import_records")
+    @throttled("import_records")
+    @app_commands.describe(
+        file="CSV (name,type,content), JSON or BIND zone file",
+        file_format="Format of the file, if it can't be told from its extension"
+    )
+    @app_commands.choices(file_format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON / JSON Lines", value="json"),
+        app_commands.Choice(name="BIND zone file", value="zone")
+    ])
+    async def import_records(self, interaction: discord.Interaction, file: discord.Attachment,
+                             file_format: Optional[app_commands.Choice[str]] = None):
         try:
-            if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+            is_admin = any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles)
+            requester = str(interaction.user.id)
+
+            if file.size > IMPORT_MAX_BYTES:
                 await interaction.response.send_message(
-                    "You do not have permission to approve records.",
+                    f"The file is too large. Maximum size is {IMPORT_MAX_BYTES // (1024 * 1024)} MB.",
+                    ephemeral=True
+                )
+                return
+
+            fmt = file_format.value if file_format else detect_format(file.filename)
+            if fmt is None:
+                await interaction.response.send_message(
+                    "Unknown file format. Please choose one with the file_format option.",
                     ephemeral=True
                 )
                 return
 
             await interaction.response.send_message(
-                f"Processing approval for record: `{record_name}`...",
+                f"Importing records from `{file.filename}`...",
                 ephemeral=True
             )
 
-            record_name = record_name.strip().lower()
+            imported, rejected, rows = 0, 0, 0
+            errors, owners, seen, batch = [], set(), set(), []
+            truncated, format_error, limit_reached = False, None, False
+            # Non-admins flush in smaller batches so reading stops soon after their pending limit is hit.
+            batch_size = IMPORT_BATCH_SIZE if is_admin else min(IMPORT_BATCH_SIZE, IMPORT_MAX_PENDING)
+
+            def reject(line_no, message):
+                nonlocal rejected
+                rejected += 1
+                if len(errors) < 10:
+                    errors.append(f"{'Line' if fmt != 'json' else 'Entry'} {line_no}: {message}"[:100])
+
+            async def flush():
+                nonlocal imported, limit_reached
+                fresh, taken, over_limit = await self.import_batch(batch, None if is_admin else IMPORT_MAX_PENDING)
+                imported += len(fresh)
+                owners.update(row[1] for row in fresh)
+                for line_no, *_ in taken:
+                    reject(line_no, "Record name is already taken")
+                for line_no, *_ in over_limit:
+                    reject(line_no, f"You already have {IMPORT_MAX_PENDING} records pending approval")
+                limit_reached = limit_reached or bool(over_limit)
+                batch.clear()
 
             try:
-                record = await self.db.execute_query(
-                    """SELECT record_name, record_type, content, userid 
-                       FROM records 
-                       WHERE LOWER(record_name) = ? AND approved = 0""",
-                    (record_name,)
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as session:
+                    async with session.get(file.url) as response:
+                        response.raise_for_status()
+                        try:
+                            async for line_no, fields in parse_records(response.content.iter_chunked(64 * 1024), fmt):
+                                rows += 1
+                                if rows > IMPORT_MAX_ROWS:
+                                    truncated = True
+                                    break
+                                try:
+                                    name, record_type, content, owner = prepare_import_row(fields, RECORD_DOMAIN)
+                                except ValueError as e:
+                                    reject(line_no, str(e))
+                                    continue
+                                if owner is not None and owner != requester and not is_admin:
+                                    reject(line_no, "Only admins can import records for other users")
+                                    continue
+                                if name in seen:
+                                    reject(line_no, f"Duplicate record name `{name}` in file")
+                                    continue
+                                seen.add(name)
+                                batch.append((line_no, owner or requester, name, record_type, content))
+                                if len(batch) >= batch_size:
+                                    await flush()
+                                    if limit_reached:
+                                        break
+                        except ImportFormatError as e:
+                            format_error = str(e)
+                if batch:
+                    await flush()
+                if owners:
+                    self.record_cache.invalidate(*owners)
+
+            except aiohttp.ClientError as download_error:
+                await interaction.edit_original_response(
+                    content=f"Failed to download the file: {str(download_error)}"
                 )
+                return
 
-                if not record:
-                    await interaction.edit_original_response(
-                        content="Record not found or already approved."
-                    )
-                    return
+            except Exception as db_error:
+                if owners:
+                    self.record_cache.invalidate(*owners)
+                error_embed = discord.Embed(
+                    title="Database Error",
+                    description=f"Failed to import records after {imported} were imported: {str(db_error)}",
+                    color=discord.Color.red()
+                )
+                await interaction.edit_original_response(content=None, embed=error_embed)
+                print(f"Database error in import_records command: {str(db_error)}")
+                return
 
-                record_name, record_type, content, record_owner_id = record[0]
+            embed = discord.Embed(
+                title="Import Results",
+                description=f"""
+                ✅ Imported: {imported}
+                ❌ Rejected: {rejected}
+                📋 Entries read: {min(rows, IMPORT_MAX_ROWS)}
+                """,
+                color=discord.Color.green() if not rejected and not truncated and not format_error and not limit_reached
+                else discord.Color.orange(),
+                timestamp=datetime.datetime.utcnow()
+            )
+            if imported:
+                embed.add_field(name="Status", value="⏳ Imported records are pending approval", inline=False)
+            if errors:
+                if rejected > len(errors):
+                    errors.append(f"... and {rejected - len(errors)} more")
+                embed.add_field(name="Errors", value="\n".join(errors), inline=False)
+            if format_error:
+                embed.add_field(name="Stopped Early", value=f"Could not read the rest of the file: {format_error}", inline=False)
+            if truncated:
+                embed.add_field(
+                    name="Limit Reached",
+                    value=f"Only the first {IMPORT_MAX_ROWS} entries were read.",
+                    inline=False
+                )
+            if limit_reached:
+                embed.add_field(
+                    name="Pending Limit Reached",
+                    value=f"You can have at most {IMPORT_MAX_PENDING} records pending approval; "
+                          "the rest of the file was not imported.",
+                    inline=False
+                )
+            embed.set_footer(text=f"Requested by {interaction.user.name}")
+
+            await interaction.edit_original_response(content=None, embed=embed)
+
+            if imported:
+                self.log_sink.log(f"Records imported: {imported} from ``{file.filename}``, {rejected} rejected by <@{interaction.user.id}>")
+
+        except discord.errors.NotFound:
+            return
+        except Exception as e:
+            try:
+                error_embed = discord.Embed(
+                    title="Error",
+                    description=f"An unexpected error occurred: {str(e)}",
+                    color=discord.Color.red()
+                )
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(embed=error_embed, ephemeral=True)
+                else:
+                    await interaction.edit_original_response(content=None, embed=error_embed)
+            except:
+                print(f"Critical error in import_records command: {str(e)}")
+
+    @app_commands.command(name="export_records", description="Export DNS records to a file (Admin only)")
+    @instrumented("export_records")
+    @app_commands.describe(
+        file_format="Format of the exported file",
+        compress="Compress the file with gzip",
+        user="Only export records owned by this user",
+        approved_only="Leave out records that are still pending approval"
+    )
+    @app_commands.choices(file_format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON Lines", value="json"),
+        app_commands.Choice(name="BIND zone file", value="zone")
+    ])
+    async def export_records(self, interaction: discord.Interaction, file_format: app_commands.Choice[str],
+                             compress: bool = False, user: Optional[discord.User] = None,
+                             approved_only: bool = False):
+        try:
+            if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+                await interaction.response.send_message(
+                    "You do not have permission to export records.",
+                    ephemeral=True
+                )
+                return
 
-                headers = {
-                    "Authorization": f"Bearer {CF_API_KEY}",
-                    "X-Auth-Email": CF_EMAIL,
-                    "Content-Type": "application/json"
-                }
-                payload = {
-                    "type": record_type,
-                    "name": f"{record_name}.is-app.top",
-                    "content": content,
-                    "ttl": 1
-                }
+            await interaction.response.send_message(
+                "Exporting records...",
+                ephemeral=True
+            )
 
+            fmt = file_format.value
+            conditions, params = ["rowid > ?"], []
+            if user is not None:
+                conditions.append("userid = ?")
+                params.append(str(user.id))
+            # Pending records aren't live in the zone, so a zone file only ever holds approved ones.
+            if approved_only or fmt == "zone":
+                conditions.append("approved = 1")
+            query = f"""SELECT rowid, record_name, record_type, content, userid, approved, created_at
+                        FROM records
+                        WHERE {' AND '.join(conditions)}
+                        ORDER BY rowid
+                        LIMIT ?"""
+
+            filename = f"records-{datetime.datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{EXPORT_EXTENSIONS[fmt]}"
+            if compress:
+                filename += ".gz"
+            size_limit = interaction.guild.filesize_limit if interaction.guild else EXPORT_MAX_BYTES
+
+            # Rows are streamed in keyset chunks into a temporary file, so memory use
+            # doesn't grow with the size of the table.
+            with tempfile.TemporaryFile() as raw_file:
                 try:
-                    response = requests.post(
-                        f"{CF_API_URL}/{ZONE_ID}/dns_records",
-                        json=payload,
-                        headers=headers
+                    output = gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=6) if compress else raw_file
+                    await asyncio.to_thread(output.write, export_header(fmt, RECORD_DOMAIN).encode())
+                    exported, last_rowid = 0, 0
+                    while True:
+                        rows = await self.db.execute_query(query, (last_rowid, *params, EXPORT_CHUNK_SIZE))
+                        if not rows:
+                            break
+                        last_rowid = rows[-1][0]
+                        exported += len(rows)
+                        data = encode_records(fmt, [row[1:] for row in rows]).encode()
+                        await asyncio.to_thread(output.write, data)
+                        if len(rows) < EXPORT_CHUNK_SIZE:
+                            break
+                    if compress:
+                        await asyncio.to_thread(output.close)
+
+                except Exception as db_error:
+                    error_embed = discord.Embed(
+                        title="Database Error",
+                        description=f"Failed to export records: {str(db_error)}",
+                        color=discord.Color.red()
                     )
+                    await interaction.edit_original_response(content=None, embed=error_embed)
+                    print(f"Database error in export_records command: {str(db_error)}")
+                    return
 
-                    if response.status_code != 200:
-                        error_data = response.json()
-                        await interaction.edit_original_response(
-                            content=f"Failed to create record in Cloudflare: {error_data.get('errors', ['Unknown error'])[0]}"
-                        )
-                        return
-
-                except requests.RequestException as cf_error:
+                size = raw_file.tell()
+                if size > size_limit:
                     await interaction.edit_original_response(
-                        content=f"Failed to communicate with Cloudflare: {str(cf_error)}"
+                        content=f"The export is {size / (1024 * 1024):.1f} MB, which is over this server's upload limit. "
+                                f"Try again with compress enabled or a user filter."
                     )
                     return
-
-                await self.db.execute_query(
-                    "UPDATE records SET approved = 1 WHERE LOWER(record_name) = ?",
-                    (record_name,)
-                )
+                raw_file.seek(0)
 
                 embed = discord.Embed(
-                    title="Record Approved Successfully",
-                    description=f"Record `{record_name}` has been approved and created in Cloudflare.",
+                    title="Export Complete",
+                    description=f"""
+                    📦 Records exported: {exported}
+                    📄 Format: {file_format.name}{' (gzip)' if compress else ''}
+                    💾 Size: {size / 1024:.1f} KB
+                    """,
                     color=discord.Color.green(),
                     timestamp=datetime.datetime.utcnow()
                 )
-                embed.add_field(name="Record Name", value=f"`{record_name}`", inline=True)
-                embed.add_field(name="Type", value=f"`{record_type}`", inline=True)
-                embed.add_field(name="Content", value=f"`{content}`", inline=True)
-                embed.set_footer(text=f"Approved by {interaction.user.name}")
-
-                await interaction.edit_original_response(content=None, embed=embed)
-
-                try:
-                    user = await self.bot.fetch_user(record_owner_id)
-                    if user:
-                        user_embed = discord.Embed(
-                            title="DNS Record Approved",
-                            description=f"Your DNS record has been approved and created in Cloudflare.",
-                            color=discord.Color.green(),
-                            timestamp=datetime.datetime.utcnow()
-                        )
-                        user_embed.add_field(name="Record Name", value=f"`{record_name}`", inline=True)
-                        user_embed.add_field(name="Type", value=f"`{record_type}`", inline=True)
-                        user_embed.add_field(name="Content", value=f"`{content}`", inline=True)
-                        await user.send(embed=user_embed)
-                except Exception as user_error:
-                    print(f"Failed to notify user {record_owner_id}: {str(user_error)}")
-
-                log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    await log_channel.send(
-                        f"Record approved: ``{record_name}`` ``({record_type})`` -> ``{content}`` by <@{interaction.user.id}>"
-                    )
+                embed.set_footer(text=f"Requested by {interaction.user.name}")
 
-            except Exception as db_error:
-                error_embed = discord.Embed(
-                    title="Database Error",
-                    description=f"Failed to approve record: {str(db_error)}",
-                    color=discord.Color.red()
+                await interaction.edit_original_response(
+                    content=None,
+                    embed=embed,
+                    attachments=[discord.File(raw_file, filename=filename)]
                 )
-                await interaction.edit_original_response(content=None, embed=error_embed)
-                print(f"Database error in approve command: {str(db_error)}")
+
+            self.log_sink.log(f"Records exported: {exported} as ``{fmt}`` by <@{interaction.user.id}>")
 
         except discord.errors.NotFound:
             return
@@ -536,9 +2504,11 @@ class DNSBot(commands.Cog):
                 else:
                     await interaction.edit_original_response(content=None, embed=error_embed)
             except:
-                print(f"Critical error in approve command: {str(e)}")
+                print(f"Critical error in export_records command: {str(e)}")
 
     @app_commands.command(name="view_records", description="View all DNS records")
+    @instrumented("view_records")
+    @throttled("view_records")
     async def view_records(self, interaction: discord.Interaction):
         try:
             is_admin = any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles)
@@ -549,23 +2519,10 @@ class DNSBot(commands.Cog):
             )
 
             try:
-                if is_admin:
-                    query = """
-                    SELECT record_name, record_type, content, approved, userid, created_at 
-                    FROM records 
-                    ORDER BY created_at DESC
-                    """
-                    records = await self.db.execute_query(query)
-                else:
-                    query = """
-                    SELECT record_name, record_type, content, created_at 
-                    FROM records 
-                    WHERE userid = ? AND approved = 1
-                    ORDER BY created_at DESC
-                    """
-                    records = await self.db.execute_query(query, (str(interaction.user.id),))
+                pager = RecordPages(self.db, None if is_admin else str(interaction.user.id), record_cache=self.record_cache)
+                total = await pager.count()
 
-                if not records:
+                if not total:
                     embed = discord.Embed(
                         title="No Records Found",
                         description="You don't have any DNS records yet." if not is_admin else "No DNS records available in the database.",
@@ -575,79 +2532,7 @@ class DNSBot(commands.Cog):
                     await interaction.edit_original_response(content=None, embed=embed)
                     return
 
-                records_per_page = 10
-                pages = [records[i:i + records_per_page] for i in range(0, len(records), records_per_page)]
-                current_page = 0
-
-                def create_page_embed(page_records, page_num):
-                    embed = discord.Embed(
-                        title="DNS Records" if not is_admin else "All DNS Records (Admin View)",
-                        description=f"Page {page_num + 1} of {len(pages)}",
-                        color=discord.Color.blue(),
-                        timestamp=datetime.datetime.utcnow()
-                    )
-                    
-                    for record in page_records:
-                        if is_admin:
-                            record_name, record_type, content, approved, userid, created_at = record
-                            status = "✅ Approved" if approved else "⏳ Pending"
-                            embed.add_field(
-                                name=f"📝 {record_name}",
-                                value=f"""
-                                **Type:** `{record_type}`
-                                **Content:** `{content}`
-                                **Status:** {status}
-                                **User:** <@{userid}>
-                                **Created:** {created_at}
-                                """,
-                                inline=False
-                            )
-                        else:
-                            record_name, record_type, content, created_at = record
-                            embed.add_field(
-                                name=f"📝 {record_name}",
-                                value=f"""
-                                **Type:** `{record_type}`
-                                **Content:** `{content}`
-                                **Created:** {created_at}
-                                """,
-                                inline=False
-                            )
-
-                    embed.set_footer(text=f"Requested by {interaction.user.name}")
-                    return embed
-
-                embed = create_page_embed(pages[current_page], current_page)
-                await interaction.edit_original_response(content=None, embed=embed)
-
-                message = await interaction.original_response()
-                if len(pages) > 1:
-                    await message.add_reaction("⬅️")
-                    await message.add_reaction("➡️")
-
-                    def check(reaction, user):
-                        return user == interaction.user and str(reaction.emoji) in ["⬅️", "➡️"] and reaction.message.id == message.id
-
-                    while True:
-                        try:
-                            reaction, user = await self.bot.wait_for("reaction_add", timeout=60.0, check=check)
-
-                            if str(reaction.emoji) == "➡️" and current_page < len(pages) - 1:
-                                current_page += 1
-                                embed = create_page_embed(pages[current_page], current_page)
-                                await message.edit(embed=embed)
-                            elif str(reaction.emoji) == "⬅️" and current_page > 0:
-                                current_page -= 1
-                                embed = create_page_embed(pages[current_page], current_page)
-                                await message.edit(embed=embed)
-
-                            await message.remove_reaction(reaction, user)
-                        except asyncio.TimeoutError:
-                            try:
-                                await message.clear_reactions()
-                            except:
-                                pass
-                            break
+                await self.paginator.start(interaction, pager, is_admin)
 
             except Exception as db_error:
                 error_embed = discord.Embed(
@@ -675,6 +2560,7 @@ class DNSBot(commands.Cog):
                 print(f"Critical error in view_records: {str(e)}")
 
     @app_commands.command(name="garbage_collector", description="Clean up unapproved records (Admin only)")
+    @instrumented("garbage_collector")
     async def garbage_collector(self, interaction: discord.Interaction):
         try:
             if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
@@ -690,22 +2576,7 @@ class DNSBot(commands.Cog):
             )
 
             try:
-                count_query = """
-                SELECT COUNT(*) 
-                FROM records 
-                WHERE approved = 0 
-                AND created_at < DATETIME('now', '-7 day')
-                """
-                count_result = await self.db.execute_query(count_query)
-                records_to_delete = count_result[0][0] if count_result else 0
-
-                delete_query = """
-                DELETE FROM records
-                WHERE approved = 0 
-                AND created_at < DATETIME('now', '-7 day')
-                RETURNING record_name, record_type, content, userid, created_at
-                """
-                deleted_records = await self.db.execute_query(delete_query)
+                deleted_count, deleted_records = await self.collect_garbage()
 
                 embed = discord.Embed(
                     title="🗑️ Garbage Collector Results",
@@ -713,9 +2584,9 @@ class DNSBot(commands.Cog):
                     timestamp=datetime.datetime.utcnow()
                 )
 
-                if records_to_delete > 0:
+                if deleted_count > 0:
                     embed.description = f"""
-                    Successfully cleaned up {len(deleted_records)} unapproved records older than 7 days.
+                    Successfully cleaned up {deleted_count} unapproved records older than {GC_RETENTION_DAYS} days.
                     
                     **Deleted Records Summary:**
                     """
@@ -733,10 +2604,10 @@ class DNSBot(commands.Cog):
                             inline=False
                         )
                     
-                    if len(deleted_records) > 10:
+                    if deleted_count > 10:
                         embed.add_field(
                             name="Note",
-                            value=f"... and {len(deleted_records) - 10} more records",
+                            value=f"... and {deleted_count - 10} more records",
                             inline=False
                         )
                 else:
@@ -747,19 +2618,7 @@ class DNSBot(commands.Cog):
 
                 await interaction.edit_original_response(content=None, embed=embed)
 
-                log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    log_embed = discord.Embed(
-                        title="Garbage Collector Executed",
-                        description=f"""
-                        🗑️ Cleanup performed by <@{interaction.user.id}>
-                        📊 Records deleted: {len(deleted_records)}
-                        📅 Cutoff date: {(datetime.datetime.utcnow() - datetime.timedelta(days=7)).strftime('%Y-%m-%d')}
-                        """,
-                        color=discord.Color.orange(),
-                        timestamp=datetime.datetime.utcnow()
-                    )
-                    await log_channel.send(embed=log_embed)
+                self.log_sink.log_embed(self.garbage_collector_log_embed(deleted_count, f"<@{interaction.user.id}>"))
 
             except Exception as db_error:
                 error_embed = discord.Embed(
@@ -787,6 +2646,7 @@ class DNSBot(commands.Cog):
                 print(f"Critical error in garbage_collector: {str(e)}")
 
     @app_commands.command(name="reminder", description="Send reminder to users with pending records (Admin only)")
+    @instrumented("reminder")
     async def reminder(self, interaction: discord.Interaction):
         try:
             if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
@@ -796,33 +2656,58 @@ class DNSBot(commands.Cog):
                 )
                 return
 
+            # Answer first: the lease needs a database round-trip and the interaction token must not expire meanwhile.
             await interaction.response.send_message(
                 "Processing reminders... Please wait.",
                 ephemeral=True
             )
 
+            # Held for the whole run so two admins (or two shard processes) never DM the same users twice.
+            # The holder is unique per run: a shared one would let a second run "renew" the first's lease.
+            reminder_lease = Lease(self.db, "reminder", f"{self.instance_id}:{secrets.token_hex(4)}")
+            if not await reminder_lease.acquire():
+                await interaction.edit_original_response(
+                    content="Reminders are already being sent. Please wait for that run to finish."
+                )
+                return
+            reminder_lease.start()
+
             try:
                 pending_records = await self.db.execute_query("""
                     SELECT userid, record_name, created_at 
                     FROM records 
                     WHERE approved = 0 AND created_at < DATETIME('now', '-3 day')
+                    ORDER BY userid, created_at
                 """)
 
-                sent_count = 0
-                failed_count = 0
+                by_user = {}
+                for user_id, record_name, created_at in pending_records:
+                    by_user.setdefault(user_id, []).append((record_name, created_at))
+
+                messages = {}
+                for user_id, user_records in by_user.items():
+                    lines = [f"• `{record_name}` (pending since {created_at})" for record_name, created_at in user_records[:20]]
+                    if len(user_records) > 20:
+                        lines.append(f"... and {len(user_records) - 20} more")
+                    messages[user_id] = {
+                        "content": "Reminder: The following DNS records are still pending approval. Please check.\n" + "\n".join(lines)
+                    }
+
+                last_update = time.monotonic()
 
-                for record in pending_records:
+                async def report_progress(sent, failed):
+                    nonlocal last_update
+                    if time.monotonic() - last_update < DM_PROGRESS_INTERVAL:
+                        return
+                    last_update = time.monotonic()
                     try:
-                        user_id, record_name, created_at = record
-                        user = await self.bot.fetch_user(user_id)
-                        if user:
-                            await user.send(
-                                f"Reminder: Your DNS record `{record_name}` has been pending for approval since {created_at}. Please check."
-                            )
-                            sent_count += 1
-                    except Exception as user_error:
-                        failed_count += 1
-                        print(f"Failed to send reminder to user {user_id}: {str(user_error)}")
+                        await interaction.edit_original_response(
+                            content=f"Processing reminders... {sent + failed}/{len(messages)} users done."
+                        )
+                    except discord.HTTPException:
+                        pass
+
+                sent_count, failed_count = await self.send_direct_messages(messages, report_progress)
 
                 embed = discord.Embed(
                     title="Reminder Status",
@@ -833,6 +2718,7 @@ class DNSBot(commands.Cog):
                     embed.description = f"""
                     📤 Reminders sent: {sent_count}
                     ❌ Failed to send: {failed_count}
+                    👥 Users reminded: {len(messages)}
                     📅 Total pending records: {len(pending_records)}
                     """
                 else:
@@ -840,7 +2726,7 @@ class DNSBot(commands.Cog):
 
                 embed.set_footer(text=f"Executed by {interaction.user.name} | {datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
                 
-                await interaction.edit_original_response(embed=embed)
+                await interaction.edit_original_response(content=None, embed=embed)
 
             except Exception as db_error:
                 error_embed = discord.Embed(
@@ -849,6 +2735,8 @@ class DNSBot(commands.Cog):
                     color=discord.Color.red()
                 )
                 await interaction.edit_original_response(embed=error_embed)
+            finally:
+                await reminder_lease.close()
 
         except discord.errors.NotFound:
             return
@@ -866,7 +2754,157 @@ class DNSBot(commands.Cog):
             except:
                 print(f"Critical error in reminder command: {str(e)}")
 
+    @app_commands.command(name="reconcile", description="Compare the database with Cloudflare (Admin only)")
+    @instrumented("reconcile")
+    @app_commands.describe(
+        repair="Fix drift where the database is the source of truth",
+        full="Page through the whole zone instead of only records changed since the last run"
+    )
+    async def reconcile(self, interaction: discord.Interaction, repair: bool = False, full: bool = False):
+        try:
+            if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+                await interaction.response.send_message(
+                    "You do not have permission to run this command.",
+                    ephemeral=True
+                )
+                return
+
+            await interaction.response.send_message(
+                "Reconciling database with Cloudflare...",
+                ephemeral=True
+            )
+
+            try:
+                report = await self.run_reconciler(repair=repair, full=full)
+            except CloudflareError as cf_error:
+                await interaction.edit_original_response(
+                    content=f"Failed to communicate with Cloudflare: {str(cf_error)}"
+                )
+                return
+            if report is None:
+                await interaction.edit_original_response(
+                    content="Another reconciliation repair is already running. Please try again when it has finished."
+                )
+                return
+
+            embed = Reconciler.build_embed(report, repair)
+            embed.set_footer(text=f"Executed by {interaction.user.name}")
+            await interaction.edit_original_response(content=None, embed=embed)
+
+            if repair and report["repaired"]:
+                self.log_sink.log(f"Reconciliation repaired {report['repaired']} records by <@{interaction.user.id}>")
+
+        except discord.errors.NotFound:
+            return
+        except Exception as e:
+            try:
+                error_embed = discord.Embed(
+                    title="Error",
+                    description=f"An unexpected error occurred: {str(e)}",
+                    color=discord.Color.red()
+                )
+                if not interaction.response.is_done():
+                    await interaction.response.send_message(embed=error_embed, ephemeral=True)
+                else:
+                    await interaction.edit_original_response(content=None, embed=error_embed)
+            except:
+                print(f"Critical error in reconcile command: {str(e)}")
+
+    @app_commands.command(name="stats", description="Show latency and load statistics (Admin only)")
+    @instrumented("stats")
+    async def stats(self, interaction: discord.Interaction):
+        try:
+            if not any(role.id == ADMIN_ROLE_ID for role in interaction.user.roles):
+                await interaction.response.send_message(
+                    "You do not have permission to run this command.",
+                    ephemeral=True
+                )
+                return
+
+            def table(histograms: dict, limit: int = 10) -> str:
+                rows = sorted(histograms.items(), key=lambda item: item[1].sum, reverse=True)[:limit]
+                if not rows:
+                    return "No data yet."
+                lines = [f"{'name':<22}{'count':>7}{'p50':>8}{'p95':>8}{'p99':>8}"]
+                for name, histogram in rows:
+                    lines.append(
+                        f"{name[:21]:<22}{histogram.count:>7}"
+                        f"{histogram.quantile(0.5) * 1000:>6.0f}ms"
+                        f"{histogram.quantile(0.95) * 1000:>6.0f}ms"
+                        f"{histogram.quantile(0.99) * 1000:>6.0f}ms"
+                    )
+                return "```\n" + "\n".join(lines) + "\n```"
+
+            embed = discord.Embed(
+                title="📊 Bot Statistics",
+                color=discord.Color.blue(),
+                timestamp=datetime.datetime.utcnow()
+            )
+            embed.add_field(name="Commands", value=table(METRICS.summary("command_latency_seconds", "command")), inline=False)
+            embed.add_field(name="Database Queries", value=table(METRICS.summary("db_query_seconds", "query")), inline=False)
+            embed.add_field(name="Cloudflare Calls", value=table(METRICS.summary("cloudflare_request_seconds", "endpoint")), inline=False)
+
+            statuses = METRICS.counters.get("cloudflare_responses_total", {})
+            by_status = {}
+            for key, count in statuses.items():
+                status = dict(key).get("status")
+                by_status[status] = by_status.get(status, 0) + count
+            embed.add_field(
+                name="Cloudflare Status Codes",
+                value=", ".join(f"`{status}`: {int(count)}" for status, count in sorted(by_status.items())) or "No data yet.",
+                inline=False
+            )
+
+            in_flight = {
+                name: int(sum(series.values()))
+                for name, series in METRICS.gauges.items()
+            }
+            cache_stats = self.record_cache.stats()
+            embed.add_field(
+                name="In Flight",
+                value=f"Commands: `{in_flight.get('commands_in_flight', 0)}` | "
+                      f"DB queries: `{in_flight.get('db_queries_in_flight', 0)}` | "
+                      f"Cloudflare: `{in_flight.get('cloudflare_requests_in_flight', 0)}`",
+                inline=False
+            )
+            outbox_depth, outbox_oldest = await self.outbox.depth()
+            embed.add_field(
+                name="Cloudflare Outbox",
+                value=f"`{outbox_depth}` queued"
+                      + (f" (oldest from {outbox_oldest} UTC)" if outbox_depth else "")
+                      + f" | Circuit breaker: `{self.outbox.breaker.state}`",
+                inline=False
+            )
+            embed.add_field(
+                name="Scheduled Jobs",
+                value=f"Run by this process (`{self.instance_id}`)" if self.lease.held
+                      else f"Run by another process; this is `{self.instance_id}`",
+                inline=False
+            )
+            embed.add_field(
+                name="Record Cache",
+                value=f"`{cache_stats['hits']}` hits / `{cache_stats['misses']}` misses ({cache_stats['hit_ratio']:.0%})",
+                inline=False
+            )
+            embed.set_footer(text=f"Requested by {interaction.user.name}")
+
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except discord.errors.NotFound:
+            return
+        except Exception as e:
+            print(f"Unexpected error in stats command: {str(e)}")
+            if not interaction.response.is_done():
+                try:
+                    await interaction.response.send_message(
+                        "An unexpected error occurred while processing the command.",
+                        ephemeral=True
+                    )
+                except:
+                    pass
+
     @app_commands.command(name="help", description="List all available commands")
+    @instrumented("help")
     async def help_command(self, interaction: discord.Interaction):
         try:
             embed = discord.Embed(
@@ -875,6 +2913,7 @@ class DNSBot(commands.Cog):
                 **Commands List**
                 🏓 /ping - Check the bot's latency
                 📝 /create_record - Create a new DNS record
+                📥 /import_records - Import records from a CSV, JSON or zone file
                 🗑️ /delete_record - Delete your DNS record
                 👀 /view_records - View your DNS records
 
@@ -906,29 +2945,67 @@ class DNSBot(commands.Cog):
             except:
                 pass
 
-class DNSBotApp(commands.Bot):
-    def __init__(self):
+class DNSBotApp(commands.AutoShardedBot):
+    def __init__(self, shard_count: Optional[int] = SHARD_COUNT, shard_ids: Optional[List[int]] = SHARD_IDS):
         intents = discord.Intents.default()
         intents.message_content = True
-        intents.reactions = True
         super().__init__(
             command_prefix="!",
             intents=intents,
-            case_insensitive=True
+            case_insensitive=True,
+            shard_count=shard_count,
+            shard_ids=shard_ids
         )
 
     async def setup_hook(self):
         await self.add_cog(DNSBot(self))
+        # Commands are global, so with several shard processes only the one running shard 0 syncs them.
+        if self.shard_ids is None or 0 in self.shard_ids:
+            await self.sync_commands()
+
+    def command_tree_hash(self) -> str:
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: (command.get("type", 1), command["name"])
+        )
+        data = json.dumps({"application_id": self.application_id, "commands": payload}, sort_keys=True)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    async def sync_commands(self):
+        # Global syncs are rate limited, so only sync when the command definitions changed.
+        current = self.command_tree_hash()
+        try:
+            with open(COMMAND_HASH_PATH) as file:
+                if file.read().strip() == current:
+                    return
+        except OSError:
+            pass
         await self.tree.sync()
+        try:
+            with open(COMMAND_HASH_PATH, "w") as file:
+                file.write(current)
+        except OSError as e:
+            print(f"Failed to save the command tree hash: {e}")
 
     async def on_ready(self):
         await self.change_presence(
             status=discord.Status.online,
             activity=discord.Game(name="Managing DNS Records")
         )
-        print(f"Logged in as {self.user}")
-
-bot = DNSBotApp()
+        print(f"Logged in as {self.user} (shards: {', '.join(map(str, sorted(self.shards)))})")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the DNS manager bot")
+    parser.add_argument("--shard-count", type=int, default=SHARD_COUNT,
+                        help="total number of shards across all processes")
+    parser.add_argument("--shards", type=int, nargs="+", default=SHARD_IDS,
+                        help="shard ids run by this process (requires --shard-count)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Prometheus port for this process (0 disables it); each process on a host needs its own")
+    args = parser.parse_args()
+    if args.shards is not None and args.shard_count is None:
+        parser.error("--shards requires --shard-count")
+    METRICS_PORT = args.metrics_port
+
+    bot = DNSBotApp(args.shard_count, args.shards)
     bot.run(TOKEN)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+from aiohttp import web
+
+
+class FakeCloudflare:
+    def __init__(self, zone_id: str = "bench-zone", latency: float = 0.0, rate_limit_every: int = 0,
+                 retry_after: int = 1, batch_fail_every: int = 0):
+        self.zone_id = zone_id
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.batch_fail_every = batch_fail_every
+        self.records = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.batches = 0
+        self.batches_failed = 0
+        self._ids = itertools.count(1)
+        self._runner = None
+        self.port = None
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/client/v4/zones"
+
+    @staticmethod
+    def _error(status: int, message: str, code: int = 1000) -> web.Response:
+        return web.json_response({"success": False, "errors": [{"code": code, "message": message}], "result": None},
+                                 status=status)
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+            self.rate_limited += 1
+            response = self._error(429, "Rate limited", 971)
+            response.headers["Retry-After"] = str(self.retry_after)
+            return response
+        return await handler(request)
+
+    def _create(self, payload: dict) -> dict:
+        for record in self.records.values():
+            if record["name"] == payload["name"] and record["type"] == payload["type"]:
+                raise ValueError("An identical record already exists.")
+        record = {
+            "id": f"{next(self._ids):032x}",
+            "type": payload["type"],
+            "name": payload["name"],
+            "content": payload["content"],
+            "ttl": payload.get("ttl", 1),
+            "proxied": False
+        }
+        self.records[record["id"]] = record
+        return record
+
+    async def list_records(self, request: web.Request) -> web.Response:
+        name = request.query.get("name")
+        record_type = request.query.get("type")
+        per_page = int(request.query.get("per_page", 100))
+        page = int(request.query.get("page", 1))
+        matches = [
+            record for record in self.records.values()
+            if (not name or record["name"] == name) and (not record_type or record["type"] == record_type)
+        ]
+        start = (page - 1) * per_page
+        return web.json_response({
+            "success": True,
+            "errors": [],
+            "result": matches[start:start + per_page],
+            "result_info": {
+                "page": page,
+                "per_page": per_page,
+                "count": len(matches[start:start + per_page]),
+                "total_count": len(matches),
+                "total_pages": max(1, -(-len(matches) // per_page))
+            }
+        })
+
+    async def create_record(self, request: web.Request) -> web.Response:
+        try:
+            record = self._create(await request.json())
+        except ValueError as e:
+            return self._error(400, str(e), 81057)
+        return web.json_response({"success": True, "errors": [], "result": record})
+
+    async def record(self, request: web.Request) -> web.Response:
+        record_id = request.match_info["record_id"]
+        if record_id not in self.records:
+            return self._error(404, "Record does not exist.", 81044)
+        if request.method == "DELETE":
+            del self.records[record_id]
+            return web.json_response({"success": True, "errors": [], "result": {"id": record_id}})
+        if request.method in ("PATCH", "PUT"):
+            self.records[record_id].update(await request.json())
+        return web.json_response({"success": True, "errors": [], "result": self.records[record_id]})
+
+    async def batch(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.batches += 1
+        injected = self.batch_fail_every and self.batches % self.batch_fail_every == 0
+        if injected:
+            self.batches_failed += 1
+            # A 5xx doesn't say whether the batch was applied, so injected failures alternate
+            # between failing before and after applying it.
+            if self.batches_failed % 2:
+                return self._error(503, "Service temporarily unavailable", 10000)
+        # Cloudflare applies a batch atomically: validate everything before changing anything.
+        for operation in payload.get("deletes", []) + payload.get("patches", []) + payload.get("puts", []):
+            if operation["id"] not in self.records:
+                self.batches_failed += not injected
+                return self._error(404, "Record does not exist.", 81044)
+        snapshot = dict(self.records)
+        result = {"deletes": [], "patches": [], "puts": [], "posts": []}
+        try:
+            for operation in payload.get("deletes", []):
+                result["deletes"].append(self.records.pop(operation["id"]))
+            for kind in ("patches", "puts"):
+                for operation in payload.get(kind, []):
+                    self.records[operation["id"]].update(operation)
+                    result[kind].append(self.records[operation["id"]])
+            for operation in payload.get("posts", []):
+                result["posts"].append(self._create(operation))
+        except ValueError as e:
+            self.records = snapshot
+            self.batches_failed += not injected
+            return self._error(400, str(e), 81057)
+        if injected:
+            return self._error(503, "Service temporarily unavailable", 10000)
+        return web.json_response({"success": True, "errors": [], "result": result})
+
+    async def start(self, port: int = 0):
+        app = web.Application(middlewares=[self.middleware])
+        base = f"/client/v4/zones/{self.zone_id}/dns_records"
+        app.router.add_get(base, self.list_records)
+        app.router.add_post(base, self.create_record)
+        app.router.add_post(f"{base}/batch", self.batch)
+        app.router.add_route("*", base + "/{record_id}", self.record)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,114 @@
+import itertools
+from types import SimpleNamespace
+
+_message_ids = itertools.count(1)
+
+
+class FakeMessage:
+    def __init__(self, embeds=None):
+        self.id = next(_message_ids)
+        self.embeds = embeds or []
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.record(content, kwargs)
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def edit_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.record(content, kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.record(content, kwargs)
+
+
+class FakeInteraction:
+    """Stands in for discord.Interaction so command callbacks can be driven directly."""
+
+    def __init__(self, user_id: int, roles=(), name: str = None, message: FakeMessage = None):
+        self.user = SimpleNamespace(
+            id=user_id,
+            name=name or f"user{user_id}",
+            mention=f"<@{user_id}>",
+            roles=[SimpleNamespace(id=role_id) for role_id in roles]
+        )
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.message = message or FakeMessage()
+        self.last_content = None
+        self.last_embed = None
+
+    def record(self, content, kwargs):
+        self.last_content = content
+        if kwargs.get("embed") is not None:
+            self.last_embed = kwargs["embed"]
+            self.message.embeds = [kwargs["embed"]]
+
+    async def edit_original_response(self, content=None, **kwargs):
+        self.record(content, kwargs)
+        return self.message
+
+    async def original_response(self):
+        return self.message
+
+
+class FakeUser:
+    def __init__(self, user_id: int, bot):
+        self.id = user_id
+        self.bot = bot
+
+    async def send(self, content=None, **kwargs):
+        self.bot.direct_messages += 1
+
+
+class FakeChannel:
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def send(self, content=None, **kwargs):
+        self.bot.log_messages += 1
+
+
+class FakeBot:
+    """The parts of commands.Bot that the DNSBot cog touches."""
+
+    def __init__(self):
+        self.latency = 0.042
+        self.direct_messages = 0
+        self.log_messages = 0
+        self.channel = FakeChannel(self)
+        self.views = []
+
+    def get_user(self, user_id: int):
+        return None
+
+    async def fetch_user(self, user_id: int):
+        return FakeUser(user_id, self)
+
+    def get_channel(self, channel_id: int):
+        return self.channel
+
+    def add_view(self, view, **kwargs):
+        self.views.append(view)
+
+    def is_ready(self) -> bool:
+        return True
+
+    async def wait_until_ready(self):
+        return None
@@ -0,0 +1,256 @@
+"""Offline benchmark for the DNSBot command paths.
+
+Drives the cog's command callbacks with stub interactions against a local
+SQLite database and a fake Cloudflare API, then reports throughput and
+latency percentiles per scenario. Fill in the settings at the top of app.py
+before running, since the module must be importable:
+
+    python -m benchmarks.run --operations 500 --concurrency 20 --table-size 50000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import app
+from benchmarks.fake_cloudflare import FakeCloudflare
+from benchmarks.fakes import FakeBot, FakeInteraction
+
+SCENARIOS = ("create", "approve", "view", "delete", "reminder", "gc", "batch")
+USER_BASE = 10_000
+
+
+def percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def failed(interaction: FakeInteraction) -> bool:
+    embed = interaction.last_embed
+    if embed is not None and embed.title in ("Error", "Database Error"):
+        return True
+    return bool(interaction.last_content and interaction.last_content.startswith("Failed"))
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self.admin_roles = (app.ADMIN_ROLE_ID,)
+
+    async def setup(self, workdir: str):
+        self.cloudflare = FakeCloudflare(latency=self.args.cf_latency, rate_limit_every=self.args.rate_limit_every,
+                                         batch_fail_every=self.args.batch_fail_every)
+        await self.cloudflare.start()
+        app.CF_API_URL = self.cloudflare.api_url
+        app.ZONE_ID = self.cloudflare.zone_id
+        app.DB_BACKEND = "sqlite"
+        app.SQLITE_PATH = os.path.join(workdir, "bench.db")
+        # The benchmark drives far more commands per user than the throttle allows.
+        app.THROTTLE.limits = {}
+        self.bot = FakeBot()
+        self.cog = app.DNSBot(self.bot)
+        # Only the outbox is wanted here (not the scheduled GC and reconcile), so take the jobs
+        # lease directly, for long enough to outlast the run.
+        self.cog.lease.ttl = 24 * 3600
+        await self.cog.lease.acquire()
+        self.cog.outbox.start()
+
+    async def teardown(self):
+        await self.cog.cog_unload()
+        await self.cloudflare.stop()
+
+    async def measure(self, name: str, factories, concurrency: int = None):
+        semaphore = asyncio.Semaphore(concurrency or self.args.concurrency)
+        latencies, errors = [], 0
+
+        async def run(factory):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                interaction = await factory()
+                latencies.append(time.perf_counter() - start)
+                if interaction is not None and failed(interaction):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(factory) for factory in factories))
+        elapsed = time.perf_counter() - start
+        self.results.append((name, len(latencies), errors, elapsed, latencies))
+
+    async def wait_for_outbox(self, name: str):
+        # Approve and delete only queue Cloudflare changes; this times how long the worker takes to apply them.
+        start = time.perf_counter()
+        while (await self.cog.outbox.depth())[0]:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        self.results.append((name, 1, 0, elapsed, [elapsed]))
+
+    def owner(self, index: int) -> int:
+        return USER_BASE + index % self.args.users
+
+    async def seed(self, count: int, approved: int, created_at: str, prefix: str):
+        rows = [
+            (str(self.owner(index)), f"{prefix}-{index}", f"{prefix}-{index}", "A",
+             f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}", approved, created_at)
+            for index in range(count)
+        ]
+        for offset in range(0, len(rows), 1000):
+            await self.cog.db.execute_many(
+                """INSERT INTO records (userid, record_name, name_key, record_type, content, approved, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                rows[offset:offset + 1000]
+            )
+
+    def command(self, callback, user_id: int, *args, admin: bool = False):
+        async def invoke():
+            interaction = FakeInteraction(user_id, self.admin_roles if admin else ())
+            await callback(self.cog, interaction, *args)
+            return interaction
+        return invoke
+
+    async def scenario_create(self):
+        count = self.args.operations
+        await self.measure("create", [
+            self.command(self.cog.create_record.callback, self.owner(index), f"bench-{index}", "A",
+                         f"10.1.{index // 256 % 256}.{index % 256}")
+            for index in range(count)
+        ])
+
+    async def scenario_approve(self):
+        await self.measure("approve", [
+            self.command(self.cog.approve.callback, 1, f"bench-{index}", admin=True)
+            for index in range(self.args.operations)
+        ])
+        await self.wait_for_outbox("approve (outbox drain)")
+
+    async def scenario_delete(self):
+        await self.measure("delete", [
+            self.command(self.cog.delete_record.callback, self.owner(index), f"bench-{index}")
+            for index in range(self.args.operations)
+        ])
+        await self.wait_for_outbox("delete (outbox drain)")
+
+    async def scenario_view(self):
+        await self.seed(self.args.table_size, 1, "2024-01-01 00:00:00", "view")
+
+        def view(user_id: int, admin: bool):
+            async def invoke():
+                interaction = FakeInteraction(user_id, self.admin_roles if admin else ())
+                await self.cog.view_records.callback(self.cog, interaction)
+                for _ in range(self.args.page_turns):
+                    turn = FakeInteraction(user_id, self.admin_roles if admin else (), message=interaction.message)
+                    await self.cog.paginator.turn(turn, 1)
+                return interaction
+            return invoke
+
+        await self.measure("view (admin)", [view(1, True) for _ in range(self.args.operations)])
+        await self.measure("view (user)", [view(self.owner(index), False) for index in range(self.args.operations)])
+
+    async def scenario_reminder(self):
+        await self.seed(self.args.pending, 0, "2000-01-01 00:00:00", "remind")
+        await self.measure("reminder", [
+            self.command(self.cog.reminder.callback, 1, admin=True)
+            for _ in range(self.args.iterations)
+        ], concurrency=1)  # Overlapping runs are refused, see the reminder lease
+        await self.cog.db.execute_query("DELETE FROM records WHERE name_key LIKE 'remind-%'")
+
+    async def scenario_gc(self):
+        latencies, errors, elapsed = [], 0, 0.0
+        for _ in range(self.args.iterations):
+            await self.seed(self.args.pending, 0, "2000-01-01 00:00:00", "gc")
+            interaction = FakeInteraction(1, self.admin_roles)
+            start = time.perf_counter()
+            await self.cog.garbage_collector.callback(self.cog, interaction)
+            latencies.append(time.perf_counter() - start)
+            elapsed += latencies[-1]
+            errors += failed(interaction)
+        self.results.append((f"gc ({self.args.pending} rows)", len(latencies), errors, elapsed, latencies))
+
+    async def scenario_batch(self):
+        # Drives CloudflareBatcher directly. Each wave includes a create that Cloudflare rejects, which
+        # fails its whole (atomic) batch, and --batch-fail-every injects 5xx answers on top; either way
+        # every operation must still get its own correct result, with no record lost or duplicated.
+        cf_batch, domain = self.cog.cf_batch, app.RECORD_DOMAIN
+        duplicate = await self.cog.cf.create_record("A", f"batch-duplicate.{domain}", "10.9.0.1")
+        names = [f"batch-{index}.{domain}" for index in range(self.args.operations)]
+
+        async def timed(operation):
+            start = time.perf_counter()
+            try:
+                result = await operation
+            except app.CloudflareError:
+                result = None
+            return time.perf_counter() - start, result
+
+        # The rejected create goes in the middle so that it shares a batch with valid ones.
+        middle = len(names) // 2
+        operations = [cf_batch.create_record("A", name, "10.9.0.2") for name in names]
+        operations.insert(middle, cf_batch.create_record("A", duplicate["name"], "10.9.0.3"))
+        start = time.perf_counter()
+        created = await asyncio.gather(*(timed(operation) for operation in operations))
+        elapsed = time.perf_counter() - start
+        rejected = created.pop(middle)
+        live = [record["name"] for record in self.cloudflare.records.values() if record["name"] in names]
+        errors = sum(result is None for _, result in created) + (rejected[1] is not None)
+        errors += len(live) - len(set(live)) + len(set(names) - set(live))
+        self.results.append(("batch create", len(created) + 1, errors, elapsed,
+                             [latency for latency, _ in created + [rejected]]))
+
+        record_ids = [result["id"] for _, result in created if result]
+        start = time.perf_counter()
+        deleted = await asyncio.gather(*(timed(cf_batch.delete_record(record_id)) for record_id in record_ids))
+        elapsed = time.perf_counter() - start
+        errors = sum(result is None for _, result in deleted)
+        errors += sum(record_id in self.cloudflare.records for record_id in record_ids)
+        self.results.append(("batch delete", len(deleted), errors, elapsed, [latency for latency, _ in deleted]))
+        await self.cog.cf.delete_record(duplicate["id"])
+
+    def report(self):
+        print(f"{'scenario':<22}{'ops':>7}{'errors':>8}{'ops/sec':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, count, errors, elapsed, latencies in self.results:
+            print(
+                f"{name:<22}{count:>7}{errors:>8}{count / elapsed if elapsed else 0:>10.1f}"
+                f"{percentile(latencies, 0.50) * 1000:>8.1f}ms"
+                f"{percentile(latencies, 0.95) * 1000:>8.1f}ms"
+                f"{percentile(latencies, 0.99) * 1000:>8.1f}ms"
+            )
+        print(f"\nCloudflare requests: {self.cloudflare.requests} ({self.cloudflare.rate_limited} rate limited), "
+              f"batches: {self.cloudflare.batches} ({self.cloudflare.batches_failed} failed), "
+              f"DMs: {self.bot.direct_messages}, log messages: {self.bot.log_messages}")
+
+    async def run(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            await self.setup(workdir)
+            try:
+                for scenario in SCENARIOS:
+                    if scenario in self.args.scenarios:
+                        await getattr(self, f"scenario_{scenario}")()
+            finally:
+                await self.teardown()
+        self.report()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DNSBot commands offline.")
+    parser.add_argument("--operations", type=int, default=200, help="operations per command scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="commands in flight at once")
+    parser.add_argument("--users", type=int, default=50, help="distinct record owners")
+    parser.add_argument("--table-size", type=int, default=10000, help="rows seeded for the view scenario")
+    parser.add_argument("--page-turns", type=int, default=3, help="page turns per view")
+    parser.add_argument("--pending", type=int, default=2000, help="pending rows seeded for reminder and gc")
+    parser.add_argument("--iterations", type=int, default=3, help="runs of the reminder and gc scenarios")
+    parser.add_argument("--cf-latency", type=float, default=0.02, help="fake Cloudflare latency in seconds")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth Cloudflare call with 429")
+    parser.add_argument("--batch-fail-every", type=int, default=0,
+                        help="answer every Nth Cloudflare batch with 503, alternately before and after applying it")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(Benchmark(parse_args()).run())
@@ -0,0 +1,461 @@
+import asyncio
+import aiohttp
+import heapq
+import itertools
+import random
+import time
+from contextlib import nullcontext
+from typing import AsyncIterator, Optional
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class CloudflareError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None, errors: Optional[list] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors or []
+        self.retry_after = retry_after
+        self.attempts = 1
+
+    @property
+    def transient(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class CloudflareConnectionError(CloudflareError):
+    pass
+
+
+class RequestScheduler:
+    # Token bucket shared by every call made with one API token. Waiters are served
+    # by priority, so interactive commands get ahead of background jobs.
+    def __init__(self, rate: float = 4.0, burst: int = 10):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def pause(self, seconds: float):
+        # A 429 means the budget is spent for every caller, not just the one that saw it.
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        if not self._waiters and time.monotonic() >= self.paused_until:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            self.tokens -= 1
+            heapq.heappop(self._waiters)[2].set_result(None)
+
+    def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, future in self._waiters:
+            future.cancel()
+        self._waiters.clear()
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive transient failures. Once `reset_timeout` has
+    # passed it lets a single probe through (half-open) and closes again on success.
+    def __init__(self, threshold: int = 5, reset_timeout: float = 60.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    @property
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        # Returns True when this failure opened the breaker.
+        self.failures += 1
+        if self.state == "half_open" or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class CloudflareClient:
+    def __init__(self, api_url: str, zone_id: str, api_key: str, email: str,
+                 timeout: float = 15.0, connect_timeout: float = 5.0,
+                 max_connections: int = 20, keepalive_timeout: float = 60.0, metrics=None,
+                 rate_limit: float = 4.0, burst: int = 10, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.api_url = api_url.rstrip("/")
+        self.zone_id = zone_id
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "X-Auth-Email": email
+        }
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.metrics = metrics
+        self.scheduler = RequestScheduler(rate_limit, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+
+    @property
+    def records_url(self) -> str:
+        return f"{self.api_url}/{self.zone_id}/dns_records"
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    headers=self.headers,
+                    timeout=self.timeout
+                )
+            return self._session
+
+    async def close(self):
+        self.scheduler.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def endpoint(self, url: str) -> str:
+        path = url[len(self.records_url):].strip("/")
+        if not path:
+            return "dns_records"
+        return "dns_records/batch" if path == "batch" else "dns_records/{id}"
+
+    def track(self, method: str, url: str):
+        if self.metrics is None:
+            return nullcontext({})
+        return self.metrics.track("cloudflare_request_seconds", in_flight="cloudflare_requests_in_flight",
+                                  method=method, endpoint=self.endpoint(url))
+
+    IDEMPOTENT_METHODS = ("GET", "PUT", "PATCH", "DELETE")
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        try:
+            return max(0.0, float(value)) if value is not None else None
+        except ValueError:
+            return None
+
+    def retry_delay(self, error: CloudflareError, attempt: int) -> float:
+        if error.retry_after is not None:
+            return min(error.retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method: str, url: str, *, json: dict = None, params: dict = None,
+                      timeout: float = None, priority: int = PRIORITY_INTERACTIVE,
+                      idempotent: Optional[bool] = None) -> dict:
+        # A 429 is always safe to retry since Cloudflare didn't act on the request. 5xx responses
+        # and connection errors are ambiguous, so only idempotent calls are retried on those.
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(priority)
+            try:
+                return await self._request_once(method, url, json, params, timeout)
+            except CloudflareError as e:
+                e.attempts = attempt + 1
+                retryable = e.status == 429 or (idempotent and e.transient)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.retry_delay(e, attempt)
+                if e.status == 429:
+                    self.scheduler.pause(delay)
+                if self.metrics is not None:
+                    self.metrics.inc("cloudflare_retries_total", method=method, status=e.status or "error")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _request_once(self, method: str, url: str, json: Optional[dict], params: Optional[dict],
+                            timeout: Optional[float]) -> dict:
+        session = await self.get_session()
+        # Passing timeout=None would disable the session's default timeout instead of keeping it.
+        options = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        with self.track(method, url) as labels:
+            labels["status"] = "error"
+            try:
+                async with session.request(method, url, json=json, params=params, **options) as response:
+                    labels["status"] = response.status
+                    if self.metrics is not None:
+                        self.metrics.inc("cloudflare_responses_total", method=method, status=response.status)
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = None
+                    if response.status != 200 or not data or not data.get("success", False):
+                        errors = (data or {}).get("errors") or []
+                        message = errors[0].get("message", str(errors[0])) if errors else f"HTTP {response.status}"
+                        raise CloudflareError(message, status=response.status, errors=errors,
+                                              retry_after=self.parse_retry_after(response.headers.get("Retry-After")))
+                    return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self.metrics is not None:
+                    self.metrics.inc("cloudflare_responses_total", method=method, status="error")
+                raise CloudflareConnectionError(str(e) or e.__class__.__name__) from e
+
+    async def iter_records(self, name: str = None, record_type: str = None, per_page: int = 100,
+                           priority: int = PRIORITY_INTERACTIVE, **filters) -> AsyncIterator[dict]:
+        params = {"per_page": per_page, **filters}
+        if name:
+            params["name"] = name
+        if record_type:
+            params["type"] = record_type
+        page = 1
+        while True:
+            params["page"] = page
+            data = await self.request("GET", self.records_url, params=params, priority=priority)
+            for record in data["result"]:
+                yield record
+            info = data.get("result_info") or {}
+            total_pages = info.get("total_pages")
+            if total_pages is None:
+                if len(data["result"]) < per_page:
+                    break
+            elif page >= total_pages:
+                break
+            page += 1
+
+    async def find_record(self, name: str, record_type: str = None,
+                          priority: int = PRIORITY_INTERACTIVE) -> Optional[dict]:
+        async for record in self.iter_records(name=name, record_type=record_type, per_page=5, priority=priority):
+            if record["name"] == name:
+                return record
+        return None
+
+    async def create_record(self, record_type: str, name: str, content: str, ttl: int = 1,
+                            priority: int = PRIORITY_INTERACTIVE, check_existing: bool = False) -> dict:
+        # A create that failed ambiguously may still have been applied, so look the record
+        # up before posting it again rather than risk a duplicate.
+        payload = {
+            "type": record_type,
+            "name": name,
+            "content": content,
+            "ttl": ttl
+        }
+        if check_existing:
+            existing = await self.find_record(name, record_type, priority)
+            if existing is not None and existing.get("content") == content:
+                return existing
+        try:
+            data = await self.request("POST", self.records_url, json=payload, priority=priority)
+        except CloudflareError as e:
+            if not e.transient or check_existing:
+                raise
+            return await self.create_record(record_type, name, content, ttl, priority, check_existing=True)
+        return data["result"]
+
+    async def delete_record(self, record_id: str, priority: int = PRIORITY_INTERACTIVE,
+                            missing_ok: bool = False) -> dict:
+        try:
+            data = await self.request("DELETE", f"{self.records_url}/{record_id}", priority=priority)
+        except CloudflareError as e:
+            # A 404 after a retry means an earlier attempt went through.
+            if e.status == 404 and (missing_ok or e.attempts > 1):
+                return {"id": record_id}
+            raise
+        return data["result"]
+
+    async def batch(self, posts: list = None, patches: list = None, puts: list = None,
+                    deletes: list = None, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        payload = {}
+        for key, operations in (("deletes", deletes), ("patches", patches), ("puts", puts), ("posts", posts)):
+            if operations:
+                payload[key] = operations
+        data = await self.request("POST", f"{self.records_url}/batch", json=payload, priority=priority)
+        return data["result"]
+
+
+class CloudflareBatcher:
+    # Cloudflare applies deletes, patches, puts and posts in that order.
+    KINDS = ("deletes", "patches", "puts", "posts")
+
+    def __init__(self, client: CloudflareClient, max_batch: int = 100, window: float = 0.05,
+                 max_in_flight: int = 2):
+        self.client = client
+        self.max_batch = max_batch
+        self.window = window
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self._pending = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def create_record(self, record_type: str, name: str, content: str, ttl: int = 1,
+                            priority: int = PRIORITY_INTERACTIVE) -> dict:
+        return await self.submit("posts", {
+            "type": record_type,
+            "name": name,
+            "content": content,
+            "ttl": ttl
+        }, priority)
+
+    async def update_record(self, record_id: str, priority: int = PRIORITY_INTERACTIVE, **changes) -> dict:
+        return await self.submit("patches", {"id": record_id, **changes}, priority)
+
+    async def delete_record(self, record_id: str, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        return await self.submit("deletes", {"id": record_id}, priority)
+
+    async def submit(self, kind: str, operation: dict, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((kind, operation, future, priority))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+        return await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        task = asyncio.create_task(self._send(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        self._flush_now()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+
+    async def _send(self, pending: list):
+        try:
+            await self._send_batch(pending)
+        except Exception as e:
+            for _, _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _send_batch(self, pending: list):
+        grouped = {kind: [] for kind in self.KINDS}
+        for kind, operation, future, _ in pending:
+            grouped[kind].append((operation, future))
+        # The batch goes out at the priority of its most urgent operation.
+        priority = min(item[3] for item in pending)
+
+        error = None
+        async with self.in_flight:
+            try:
+                result = await self.client.batch(priority=priority, **{
+                    kind: [operation for operation, _ in items] for kind, items in grouped.items()
+                })
+            except CloudflareError as e:
+                error = e
+
+        if error is not None:
+            if error.transient:
+                # The batch may already have been applied, so every operation is retried on its
+                # own in a way that doesn't duplicate or trip over its effects.
+                await asyncio.gather(*(self._send_single(kind, operation, future, item_priority, True)
+                                       for kind, operation, future, item_priority in pending))
+            elif len(pending) == 1:
+                pending[0][2].set_exception(error)
+            else:
+                # A batch is applied atomically, so one bad record fails all of them. Halving it
+                # finds the bad records in O(log n) extra calls instead of one call per record;
+                # the halves go out in order so operations still apply in submission order.
+                middle = len(pending) // 2
+                await self._send_batch(pending[:middle])
+                await self._send_batch(pending[middle:])
+            return
+
+        for kind, items in grouped.items():
+            results = result.get(kind) or []
+            for index, (operation, future) in enumerate(items):
+                if future.done():
+                    continue
+                if index < len(results):
+                    future.set_result(results[index])
+                else:
+                    future.set_exception(CloudflareError(f"Missing result for batched {kind[:-1]}"))
+
+    async def _send_single(self, kind: str, operation: dict, future: asyncio.Future,
+                           priority: int = PRIORITY_INTERACTIVE, ambiguous: bool = False):
+        try:
+            if kind == "posts":
+                result = await self.client.create_record(operation["type"], operation["name"], operation["content"],
+                                                         operation.get("ttl", 1), priority, check_existing=ambiguous)
+            elif kind == "deletes":
+                result = await self.client.delete_record(operation["id"], priority, missing_ok=ambiguous)
+            else:
+                changes = {key: value for key, value in operation.items() if key != "id"}
+                method = "PATCH" if kind == "patches" else "PUT"
+                url = f"{self.client.records_url}/{operation['id']}"
+                result = (await self.client.request(method, url, json=changes, priority=priority))["result"]
+        except CloudflareError as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
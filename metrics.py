@@ -0,0 +1,166 @@
+import functools
+import time
+from aiohttp import web
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self.counters: Dict[str, Dict[tuple, float]] = {}
+        self.gauges: Dict[str, Dict[tuple, float]] = {}
+        self.help: Dict[str, str] = {}
+
+    @staticmethod
+    def _key(labels: dict) -> tuple:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = self._key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = self._key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def gauge_add(self, name: str, amount: float, **labels):
+        series = self.gauges.setdefault(name, {})
+        key = self._key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def track(self, name: str, in_flight: Optional[str] = None, **labels):
+        # Labels added to the yielded dict (e.g. a status) are attached to the observation.
+        extra = {}
+        if in_flight:
+            self.gauge_add(in_flight, 1, **labels)
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels, **extra)
+            if in_flight:
+                self.gauge_add(in_flight, -1, **labels)
+
+    def timed(self, name: str, in_flight: Optional[str] = None, **labels):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.track(name, in_flight, **labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self, name: str, label: str) -> Dict[str, Histogram]:
+        merged = {}
+        for key, histogram in self.histograms.get(name, {}).items():
+            value = dict(key).get(label, "")
+            target = merged.get(value)
+            if target is None:
+                target = merged[value] = Histogram(self.buckets)
+            target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+            target.sum += histogram.sum
+            target.count += histogram.count
+        return merged
+
+    @staticmethod
+    def _format_labels(key: tuple, extra: tuple = ()) -> str:
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        escaped = []
+        for name, value in pairs:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{name}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# HELP {name} {self.help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{self._format_labels(key)} {value}")
+        for name, series in sorted(self.gauges.items()):
+            lines.append(f"# HELP {name} {self.help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in series.items():
+                lines.append(f"{name}{self._format_labels(key)} {value}")
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# HELP {name} {self.help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(key, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(key, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{self._format_labels(key)} {histogram.sum}")
+                lines.append(f"{name}_count{self._format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
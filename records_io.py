@@ -0,0 +1,258 @@
+import codecs
+import csv
+import io
+import ipaddress
+import json
+import re
+from typing import AsyncIterator, Optional, Tuple
+
+RECORD_TYPES = ("A", "AAAA", "CNAME", "NS")
+
+IPV4_PATTERN = re.compile(r'^(\d{1,3}\.){3}\d{1,3}$')
+DOMAIN_PATTERN = re.compile(r'^(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$')
+RECORD_NAME_PATTERN = re.compile(r'^(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?\.)*[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?$')
+
+RECORD_FORMATS = {
+    "A": "IPv4 address (e.g., 192.168.1.1)",
+    "AAAA": "IPv6 address (e.g., 2001:0db8:85a3:0000:0000:8a2e:0370:7334)",
+    "CNAME": "Domain name (e.g., example.com)",
+    "NS": "Nameserver domain (e.g., ns1.example.com)"
+}
+
+IMPORT_FORMATS = ("csv", "json", "zone")
+FORMAT_EXTENSIONS = {
+    "csv": "csv",
+    "json": "json",
+    "jsonl": "json",
+    "ndjson": "json",
+    "zone": "zone",
+    "bind": "zone",
+    "db": "zone",
+    "txt": "zone"
+}
+COLUMN_ALIASES = {
+    "name": "name",
+    "record_name": "name",
+    "type": "type",
+    "record_type": "type",
+    "content": "content",
+    "value": "content",
+    "owner": "owner",
+    "userid": "owner"
+}
+ZONE_CLASSES = ("IN", "CH", "HS")
+MAX_ENTRY_SIZE = 64 * 1024
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def _validate_ipv4(content: str) -> Optional[str]:
+    if not IPV4_PATTERN.match(content):
+        return "Invalid IPv4 address format. Example: 192.168.1.1"
+    if any(int(octet) > 255 for octet in content.split('.')):
+        return "IPv4 address octets must be between 0 and 255"
+    return None
+
+
+def _validate_ipv6(content: str) -> Optional[str]:
+    try:
+        ipaddress.IPv6Address(content)
+    except ValueError:
+        return "Invalid IPv6 address format. Example: 2001:0db8:85a3:0000:0000:8a2e:0370:7334"
+    return None
+
+
+def _domain_validator(record_type: str):
+    def validate(content: str) -> Optional[str]:
+        if not DOMAIN_PATTERN.match(content):
+            return f"Invalid domain format for {record_type} record. Example: example.com"
+        return None
+    return validate
+
+
+RECORD_VALIDATORS = {
+    "A": _validate_ipv4,
+    "AAAA": _validate_ipv6,
+    "CNAME": _domain_validator("CNAME"),
+    "NS": _domain_validator("NS")
+}
+
+
+def validate_record(record_type: str, content: str) -> Optional[str]:
+    validator = RECORD_VALIDATORS.get(record_type)
+    if validator is None:
+        return f"Invalid record type. Supported types: {', '.join(RECORD_TYPES)}."
+    return validator(content)
+
+
+def detect_format(filename: str) -> Optional[str]:
+    _, _, extension = filename.lower().rpartition(".")
+    return FORMAT_EXTENSIONS.get(extension)
+
+
+def prepare_import_row(fields: dict, origin: str) -> Tuple[str, str, str, Optional[str]]:
+    if not isinstance(fields, dict):
+        raise ValueError("Entry is not an object")
+    name = str(fields.get("name") or "").strip().lower().rstrip(".")
+    record_type = str(fields.get("type") or "").strip().upper()
+    content = str(fields.get("content") or "").strip()
+    owner = str(fields.get("owner") or "").strip() or None
+
+    if name in ("@", origin):
+        raise ValueError("Records at the zone apex cannot be imported")
+    if name.endswith(f".{origin}"):
+        name = name[:-len(origin) - 1]
+    if not RECORD_NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid record name `{name[:40]}`")
+    if record_type in ("CNAME", "NS"):
+        content = content.rstrip(".")
+    error = validate_record(record_type, content)
+    if error:
+        raise ValueError(error)
+    if owner is not None and not owner.isdigit():
+        raise ValueError(f"Invalid owner `{owner[:40]}`")
+    return name, record_type, content, owner
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    line_no = 0
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+        if len(buffer) > MAX_ENTRY_SIZE:
+            raise ImportFormatError(f"Line {line_no + 1} is too long")
+    if buffer:
+        yield line_no + 1, buffer.rstrip("\r")
+
+
+async def _parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, dict]]:
+    columns = None
+    async for line_no, line in _iter_lines(chunks):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        values = [value.strip() for value in next(csv.reader((line,)))]
+        if columns is None:
+            header = [COLUMN_ALIASES.get(value.lower()) for value in values]
+            if "name" in header and "type" in header:
+                columns = header
+                continue
+            columns = ["name", "type", "content", "owner"]
+        yield line_no, {column: value for column, value in zip(columns, values) if column}
+
+
+async def _parse_json(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, dict]]:
+    # Accepts both a top-level array of objects and newline-delimited objects
+    # while only ever holding the current entry in memory.
+    decoder = json.JSONDecoder()
+    entry = 0
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer += text
+        while True:
+            buffer = buffer.lstrip(" \t\r\n,[]")
+            if not buffer:
+                break
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if len(buffer) > MAX_ENTRY_SIZE:
+                    raise ImportFormatError(f"Malformed JSON in entry {entry + 1}")
+                break
+            buffer = buffer[end:]
+            entry += 1
+            if isinstance(value, dict):
+                value = {COLUMN_ALIASES.get(str(key).lower(), key): item for key, item in value.items()}
+            yield entry, value
+    if buffer.strip(" \t\r\n,[]"):
+        raise ImportFormatError(f"Malformed JSON in entry {entry + 1}")
+
+
+async def _parse_zone(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, dict]]:
+    last_name = None
+    pending, start = "", 0
+    async for line_no, line in _iter_lines(chunks):
+        line = line.split(";", 1)[0]
+        if pending or "(" in line:
+            # Multi-line entries (usually the SOA) are joined before parsing.
+            start = start or line_no
+            part = line.replace("(", " ").replace(")", " ")
+            pending = f"{pending} {part}" if pending else part
+            if ")" not in line:
+                continue
+            line, pending, line_no, start = pending, "", start, 0
+        if not line.strip() or line.lstrip().startswith("$"):
+            continue
+
+        tokens = line.split()
+        if line[0] in " \t":
+            name = last_name
+        else:
+            name = last_name = tokens.pop(0)
+        while tokens and (tokens[0].isdigit() or tokens[0].upper() in ZONE_CLASSES):
+            tokens.pop(0)
+        if name is None or len(tokens) < 2:
+            yield line_no, {"name": name or "", "type": tokens[0] if tokens else "", "content": ""}
+            continue
+        if tokens[0].upper() == "SOA":
+            continue
+        yield line_no, {"name": name, "type": tokens[0], "content": " ".join(tokens[1:])}
+
+
+PARSERS = {
+    "csv": _parse_csv,
+    "json": _parse_json,
+    "zone": _parse_zone
+}
+
+
+def parse_records(chunks: AsyncIterator[bytes], file_format: str) -> AsyncIterator[Tuple[int, dict]]:
+    return PARSERS[file_format](chunks)
+
+
+EXPORT_COLUMNS = ("name", "type", "content", "owner", "approved", "created_at")
+EXPORT_EXTENSIONS = {
+    "csv": "csv",
+    "json": "jsonl",
+    "zone": "zone"
+}
+
+
+def export_header(file_format: str, origin: str) -> str:
+    if file_format == "csv":
+        return ",".join(EXPORT_COLUMNS) + "\r\n"
+    if file_format == "zone":
+        return f"$ORIGIN {origin}.\n"
+    return ""
+
+
+def encode_records(file_format: str, rows: list) -> str:
+    # rows are (name, type, content, owner, approved, created_at), already in export order.
+    if file_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    if file_format == "json":
+        return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+    lines = []
+    for name, record_type, content, *_ in rows:
+        if record_type in ("CNAME", "NS"):
+            content = f"{content}."
+        lines.append(f"{name}\tIN\t{record_type}\t{content}\n")
+    return "".join(lines)
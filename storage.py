@@ -0,0 +1,79 @@
+import sqlite3
+import sqlitecloud
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+class StorageDriver(ABC):
+    name = "base"
+    # When set, every write runs on one connection owned by a single dedicated thread.
+    dedicated_writer = False
+
+    @abstractmethod
+    def connect(self, read_only: bool = False):
+        ...
+
+    @property
+    def writer_executor(self) -> Optional[ThreadPoolExecutor]:
+        return None
+
+    def close(self):
+        pass
+
+
+class SQLiteCloudDriver(StorageDriver):
+    name = "sqlitecloud"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def connect(self, read_only: bool = False):
+        return sqlitecloud.connect(self.url)
+
+
+class SQLiteDriver(StorageDriver):
+    name = "sqlite"
+    dedicated_writer = True
+
+    PRAGMAS = (
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA mmap_size = 134217728",
+        "PRAGMA foreign_keys = ON"
+    )
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._writer_executor = None
+
+    def connect(self, read_only: bool = False):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @property
+    def writer_executor(self) -> ThreadPoolExecutor:
+        if self._writer_executor is None:
+            self._writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        return self._writer_executor
+
+    def close(self):
+        if self._writer_executor is not None:
+            self._writer_executor.shutdown(wait=False)
+            self._writer_executor = None
+
+
+def create_driver(backend: str, url: str = None, path: str = None) -> StorageDriver:
+    if backend == "sqlitecloud":
+        return SQLiteCloudDriver(url)
+    if backend == "sqlite":
+        return SQLiteDriver(path)
+    raise ValueError(f"Unknown storage backend: {backend}")